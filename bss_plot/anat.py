@@ -1,3 +1,8 @@
+import itertools
+import os
+from collections import OrderedDict, namedtuple
+from weakref import WeakKeyDictionary, ref
+
 import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 import nibabel as nib
@@ -5,20 +10,574 @@ import numpy as np
 import numpy.ma as ma
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes, mark_inset
 from nilearn import plotting
-from scipy.ndimage import center_of_mass
+from scipy.ndimage import map_coordinates
 from skimage.measure import find_contours
 
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "entries", "nbytes", "max_bytes"]
+)
 
-def get_cut_coords(nii_img):
-    # Load the NIfTI image
-    if isinstance(nii_img, str):
-        nii_img = nib.load(nii_img)
 
-    # Get the data array (voxel intensities)
-    data = nii_img.get_fdata()
+class VolumeCache:
+    """
+    LRU cache of NIfTI images, their voxel arrays and summary statistics.
+
+    Images given as file paths are keyed by path, modification time and size,
+    so a rewritten file is loaded again; image objects are keyed by identity
+    and only weakly referenced, their entries are dropped when the caller
+    frees them. Voxel arrays loaded by the cache count against max_bytes and
+    the least recently used ones are evicted first; arrays larger than
+    max_bytes are never loaded, their slices and statistics are read through
+    dataobj instead. Images that already hold their voxels in memory are
+    read from those, which the cache neither copies nor counts. The minimum,
+    maximum and center of mass are kept for up to max_entries images. Hits
+    and misses count the images looked up through load, once per image in
+    each call of get_cut_coords, plot_slice, add_overlay and plot_mosaic.
+
+    Parameters:
+    max_bytes (int): Memory budget for voxel arrays.
+    max_entries (int): Maximum number of cached images.
+    """
+
+    def __init__(self, max_bytes=2 * 1024**3, max_entries=128):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        # id of every image loaded from a path -> key of its entry
+        self._aliases = {}
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and "data" in entry:
+            self.nbytes -= entry["data"].nbytes
+
+    def _key(self, nii_img):
+        if isinstance(nii_img, (str, os.PathLike)):
+            path = os.path.abspath(nii_img)
+            stat = os.stat(path)
+            return ("path", path, stat.st_mtime_ns, stat.st_size)
+        return self._aliases.get(id(nii_img), ("id", id(nii_img)))
+
+    def entry(self, nii_img, count=False):
+        """
+        Get the cache entry of an image or file path, loading it on a miss.
+        With count, the lookup counts as a hit or miss.
+
+        Returns:
+        dict: The entry, holding an image loaded from a path under "img" and
+        a weak reference to an image object under "ref".
+        """
+        key = self._key(nii_img)
+        if key in self._entries:
+            self.hits += count
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += count
+        if key[0] == "path":
+            nii_img = nib.load(key[1])
+            self._aliases[id(nii_img)] = key
+            entry = {"img": nii_img}
+        else:
+            # the entry is dropped with the image, before its id can be reused
+            try:
+                entry = {"ref": ref(nii_img, lambda _: self._drop(key))}
+            except TypeError:
+                return {"img": nii_img}
+        self._entries[key] = entry
+        self._evict()
+        return entry
+
+    @staticmethod
+    def image(entry):
+        """Get the image of a cache entry."""
+        return entry["img"] if "img" in entry else entry["ref"]()
+
+    def load(self, nii_img):
+        """Get the image of a file path (or the image itself) from the cache."""
+        return self.image(self.entry(nii_img, count=True))
+
+    def data(self, nii_img):
+        """
+        Get the voxel array of an image as np.asanyarray(img.dataobj) gives
+        it, i.e. scaled to float if the image has a slope or intercept.
+
+        Returns:
+        ndarray: The array, or None if it does not fit into max_bytes, in
+        which case it is not loaded at all. An array the image already holds
+        is returned as is, without being cached.
+        """
+        entry = self.entry(nii_img)
+        if "data" in entry:
+            return entry["data"]
+        dataobj = self.image(entry).dataobj
+        if isinstance(dataobj, np.ndarray):
+            return dataobj
+        if _array_nbytes(dataobj) > self.max_bytes:
+            return None
+        data = np.asanyarray(dataobj)
+        entry["data"] = data
+        self.nbytes += data.nbytes
+        self._evict()
+        return entry.get("data", data)
+
+    def stats(self, nii_img):
+        """
+        Get the summary statistics of an image.
+
+        Returns:
+        dict: "min" and "max" ignoring NaNs, "negative" and "positive" flags.
+        """
+        entry = self.entry(nii_img)
+        if "stats" not in entry:
+            data = entry.get("data", self.image(entry).dataobj)
+            vmin, vmax = _scan_range(data)
+            entry["stats"] = {
+                "min": vmin,
+                "max": vmax,
+                "negative": vmin < 0,
+                "positive": vmax > 0,
+            }
+        return entry["stats"]
+
+    def center_of_mass(self, nii_img, step=1):
+        """Get the center of mass of an image in voxel coordinates, see
+        get_center_of_mass."""
+        entry = self.entry(nii_img)
+        com = entry.setdefault("com", {})
+        if step not in com:
+            data = self.data(nii_img)
+            if data is None:
+                data = self.image(entry).dataobj
+            com[step] = _center_of_mass(data, step)
+        return com[step]
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            _, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry["data"].nbytes if "data" in entry else 0
+            if "img" in entry:
+                self._aliases.pop(id(entry["img"]), None)
+        for entry in list(self._entries.values()):
+            if self.nbytes <= self.max_bytes:
+                break
+            if "data" in entry:
+                self.nbytes -= entry.pop("data").nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._aliases.clear()
+        self.nbytes = 0
+
+    def info(self):
+        return CacheInfo(
+            self.hits, self.misses, len(self._entries), self.nbytes, self.max_bytes
+        )
+
+
+def _array_nbytes(dataobj):
+    """Bytes of np.asanyarray(dataobj), without loading it."""
+    dtype = np.dtype(dataobj.dtype)
+    if getattr(dataobj, "slope", 1) != 1 or getattr(dataobj, "inter", 0) != 0:
+        dtype = np.promote_types(dtype, np.float64)
+    return int(np.prod(dataobj.shape)) * dtype.itemsize
+
+
+_volume_cache = None
+
+
+def enable_cache(max_bytes=2 * 1024**3, max_entries=128):
+    """
+    Cache loaded images, voxel arrays and statistics across calls.
+
+    Once enabled, get_cut_coords, plot_slice and add_overlay reuse what
+    earlier calls on the same file path or image object loaded, within a
+    memory budget of max_bytes for voxel arrays and max_entries images.
+
+    Returns:
+    VolumeCache: The cache.
+    """
+    global _volume_cache
+    _volume_cache = VolumeCache(max_bytes, max_entries)
+    return _volume_cache
+
+
+def disable_cache():
+    """Stop caching and free the cached images."""
+    global _volume_cache
+    _volume_cache = None
+
+
+def cache_info():
+    """
+    Get the hits, misses, number of entries and bytes of the cache.
+
+    Returns:
+    CacheInfo: The counters, or None if the cache is disabled.
+    """
+    if _volume_cache is None:
+        return None
+    return _volume_cache.info()
+
+
+def load_img(nii_img):
+    """Load a NIfTI image from a file path, through the cache if enabled."""
+    if _volume_cache is not None:
+        return _volume_cache.load(nii_img)
+    if isinstance(nii_img, (str, os.PathLike)):
+        return nib.load(nii_img)
+    return nii_img
+
+
+def get_slice_data(nii_img, axis, index):
+    """
+    Get one 2D slice of a NIfTI image as float64, reading only that plane.
+
+    The slice is indexed through nii_img.dataobj, so nibabel reads (or
+    memory-maps) just the needed voxels instead of loading the whole volume.
+    For 4D images the slice of the first volume is returned.
+
+    Parameters:
+    nii_img (Nifti1Image): The image to slice.
+    axis (int): The voxel axis to slice along (0, 1 or 2).
+    index (int): The voxel index along axis.
+
+    Returns:
+    ndarray: The 2D slice.
+    """
+    slicer = [slice(None)] * 3
+    slicer[axis] = index
+    return _read(nii_img, slicer)
+
+
+def _read(nii_img, slicer):
+    """Voxels of the first volume of nii_img in a region of the first three
+    axes, as float64, from the cache if enabled or else through dataobj."""
+    slicer = tuple(slicer) + (0,) * (len(nii_img.shape) - 3)
+    data = None
+    if _volume_cache is not None:
+        data = _volume_cache.data(nii_img)
+    if data is None:
+        data = nii_img.dataobj
+    return np.asarray(data[slicer], dtype=np.float64)
+
+
+# world axis normal to each plane, then the world axes of slice columns and rows
+PLANES = {
+    "sagittal": (0, 1, 2),
+    "coronal": (1, 0, 2),
+    "horizontal": (2, 0, 1),
+}
+AXIS_LABELS = ("X (mm)", "Y (mm)", "Z (mm)")
+
+# slice grid drawn by plot_slice on each axis
+_slice_grids = WeakKeyDictionary()
+
+
+def _plane_axes(plane):
+    if plane not in PLANES:
+        raise ValueError(
+            f"Unknown plane '{plane}', use 'sagittal', 'coronal' or 'horizontal'."
+        )
+    return PLANES[plane]
+
+
+def _world_axes(affine):
+    """Voxel axis along each world axis, or None if the affine rotates or
+    shears the voxel grid."""
+    rzs = np.abs(np.asarray(affine)[:3, :3])
+    nonzero = rzs > 1e-6 * rzs.max()
+    if (nonzero.sum(axis=0) != 1).any() or (nonzero.sum(axis=1) != 1).any():
+        return None
+    return nonzero.argmax(axis=1)
+
+
+def _voxel_positions(affine, shape, world_axis, voxel_axes):
+    """World coordinates of the voxels along world_axis, see _world_axes."""
+    axis = voxel_axes[world_axis]
+    return affine[world_axis, 3] + affine[world_axis, axis] * np.arange(shape[axis])
+
+
+class SliceGrid:
+    """
+    World-aligned 2D grid on which a slice plane is sampled.
+
+    Slice columns and rows lie at the world coordinates u and v along the
+    in-plane axes of the plane, e.g. Y and Z for sagittal slices. Voxel
+    coordinates of the grid points are computed once per affine and
+    memoized, so the background and overlays of a plot are resampled onto
+    one shared grid.
+
+    Parameters:
+    plane (str): The plane ("sagittal", "coronal", "horizontal").
+    slice_mm (float): The position of the plane in millimeters.
+    u (ndarray): World coordinates of the columns.
+    v (ndarray): World coordinates of the rows, from bottom to top.
+    """
+
+    def __init__(self, plane, slice_mm, u, v):
+        _plane_axes(plane)
+        self.plane = plane
+        self.slice_mm = slice_mm
+        self.u = u
+        self.v = v
+        self._voxel_coords = {}
+
+    @classmethod
+    def from_img(cls, nii_img, plane, slice_mm):
+        """
+        Get the grid of the voxels of an image in a plane.
+
+        Without rotation or shear this is the voxel grid of the image itself,
+        otherwise the world bounding box of the image sampled at its smallest
+        voxel size.
+        """
+        _, column_axis, row_axis = _plane_axes(plane)
+        affine = nii_img.affine
+        shape = nii_img.shape[:3]
+        voxel_axes = _world_axes(affine)
+        if voxel_axes is not None:
+            u = _voxel_positions(affine, shape, column_axis, voxel_axes)
+            v = _voxel_positions(affine, shape, row_axis, voxel_axes)
+        else:
+            corners = nib.affines.apply_affine(
+                affine, list(itertools.product(*[(0, n - 1) for n in shape]))
+            )
+            step = np.sqrt((affine[:3, :3] ** 2).sum(axis=0)).min()
+            u, v = (
+                np.arange(
+                    corners[:, axis].min(), corners[:, axis].max() + step / 2, step
+                )
+                for axis in (column_axis, row_axis)
+            )
+        return cls(plane, slice_mm, u, v)
+
+    @property
+    def extent(self):
+        return [self.u[0], self.u[-1], self.v[0], self.v[-1]]
+
+    def matches(self, plane, slice_mm):
+        return plane == self.plane and slice_mm == self.slice_mm
+
+    def voxel_coords(self, affine):
+        """Voxel coordinates (3, len(v), len(u)) of the grid points in an
+        image with this affine, memoized per affine."""
+        affine = np.asarray(affine, dtype=np.float64)
+        key = affine.tobytes()
+        if key not in self._voxel_coords:
+            normal_axis, column_axis, row_axis = PLANES[self.plane]
+            world = np.empty((3, len(self.v), len(self.u)))
+            world[normal_axis] = self.slice_mm
+            world[column_axis] = self.u[np.newaxis, :]
+            world[row_axis] = self.v[:, np.newaxis]
+            inverse = np.linalg.inv(affine)
+            self._voxel_coords[key] = (
+                np.tensordot(inverse[:3, :3], world, axes=1)
+                + inverse[:3, 3, np.newaxis, np.newaxis]
+            )
+        return self._voxel_coords[key]
+
+    def sample(self, nii_img, order=1):
+        """
+        Sample an image on the grid.
+
+        Images whose voxels lie on the grid are sliced at the nearest voxel
+        plane without interpolation, reading only that plane. Others are
+        interpolated with map_coordinates of the given spline order from the
+        block of voxels the grid passes through; points outside the image
+        are NaN.
+
+        Returns:
+        ndarray: The slice with rows from bottom to top.
+        """
+        normal_axis, column_axis, row_axis = PLANES[self.plane]
+        affine = nii_img.affine
+        voxel_axes = self._voxel_axes_on_grid(nii_img)
+        if voxel_axes is not None:
+            axis = voxel_axes[normal_axis]
+            slice_index = int(
+                np.round(
+                    (self.slice_mm - affine[normal_axis, 3]) / affine[normal_axis, axis]
+                )
+            )
+            img_slice = get_slice_data(nii_img, axis, slice_index)
+            if voxel_axes[column_axis] < voxel_axes[row_axis]:
+                img_slice = img_slice.T
+            return img_slice
+        return _interpolate(nii_img, self.voxel_coords(affine), order)
+
+    def sample_stack(self, nii_img, slices, order=1):
+        """
+        Sample an image on the grid at several positions of the plane.
+
+        All slices are gathered from a single read of the block of voxels
+        they pass through, sliced or interpolated as in sample. Slices
+        outside the image are NaN.
+
+        Returns:
+        ndarray: The slices (len(slices), len(v), len(u)), rows from bottom
+        to top.
+        """
+        normal_axis, column_axis, row_axis = PLANES[self.plane]
+        slices = np.asarray(slices, dtype=np.float64)
+        affine = nii_img.affine
+        voxel_axes = self._voxel_axes_on_grid(nii_img)
+        if voxel_axes is not None:
+            axis = voxel_axes[normal_axis]
+            index = np.round(
+                (slices - affine[normal_axis, 3]) / affine[normal_axis, axis]
+            ).astype(int)
+            inside = (index >= 0) & (index < nii_img.shape[axis])
+            stack = np.full((len(slices), len(self.v), len(self.u)), np.nan)
+            if inside.any():
+                lower = index[inside].min()
+                slicer = [slice(None)] * 3
+                slicer[axis] = slice(lower, index[inside].max() + 1)
+                block = np.moveaxis(_read(nii_img, slicer), axis, 0)
+                block = block[index[inside] - lower]
+                if voxel_axes[column_axis] < voxel_axes[row_axis]:
+                    block = block.transpose(0, 2, 1)
+                stack[inside] = block
+            return stack
+
+        # moving the plane along its normal shifts all voxel coordinates alike
+        shift = np.linalg.inv(affine)[:3, normal_axis, np.newaxis] * (
+            slices - self.slice_mm
+        )
+        coords = (
+            self.voxel_coords(affine)[:, np.newaxis]
+            + shift[:, :, np.newaxis, np.newaxis]
+        )
+        return _interpolate(nii_img, coords, order)
+
+    def _voxel_axes_on_grid(self, nii_img):
+        """Voxel axis along each world axis if the voxels of nii_img lie on
+        the grid, else None."""
+        _, column_axis, row_axis = PLANES[self.plane]
+        affine = nii_img.affine
+        shape = nii_img.shape[:3]
+        voxel_axes = _world_axes(affine)
+        if voxel_axes is None:
+            return None
+        u = _voxel_positions(affine, shape, column_axis, voxel_axes)
+        v = _voxel_positions(affine, shape, row_axis, voxel_axes)
+        if (
+            u.shape == self.u.shape
+            and v.shape == self.v.shape
+            and np.allclose(u, self.u)
+            and np.allclose(v, self.v)
+        ):
+            return voxel_axes
+        return None
+
+
+def _interpolate(nii_img, coords, order=1):
+    """Interpolate the first volume of nii_img at voxel coordinates
+    (3, ...) from the block of voxels they span, NaN outside the image."""
+    flat = coords.reshape(3, -1)
+    lower = np.maximum(np.floor(flat.min(axis=1)).astype(int), 0)
+    upper = np.minimum(np.ceil(flat.max(axis=1)).astype(int) + 1, nii_img.shape[:3])
+    if (upper <= lower).any():
+        return np.full(coords.shape[1:], np.nan)
+    block = _read(nii_img, [slice(a, b) for a, b in zip(lower, upper)])
+    offset = lower.reshape((3,) + (1,) * (coords.ndim - 1))
+    return map_coordinates(
+        block, coords - offset, order=order, mode="constant", cval=np.nan
+    )
+
+
+def get_data_range(nii_img, slab_size=16):
+    """
+    Get the minimum and maximum of a NIfTI image, ignoring NaNs.
+
+    The volume is read through nii_img.dataobj in slabs of slab_size planes
+    along the last axis, so at most one slab is in memory at a time.
+
+    Returns:
+    tuple: (min, max)
+    """
+    if _volume_cache is not None:
+        stats = _volume_cache.stats(nii_img)
+        return stats["min"], stats["max"]
+    return _scan_range(nii_img.dataobj, slab_size)
+
+
+def _scan_range(data, slab_size=16):
+    vmin, vmax = np.inf, -np.inf
+    n_planes = data.shape[-1]
+    for start in range(0, n_planes, slab_size):
+        slab = np.asarray(data[..., start : start + slab_size])
+        if np.issubdtype(slab.dtype, np.floating) and np.isnan(slab).all():
+            continue
+        vmin = min(vmin, float(np.nanmin(slab)))
+        vmax = max(vmax, float(np.nanmax(slab)))
+    return vmin, vmax
+
+
+def get_center_of_mass(nii_img, step=1, slab_size=16):
+    """
+    Get the intensity-weighted center of mass of a NIfTI image in voxel coordinates.
+
+    The volume is read through nii_img.dataobj in slabs of slab_size planes
+    in its stored data type, accumulating the weighted sums in float64, so
+    the whole volume is never held in memory. With step > 1 only every
+    step-th voxel along each axis is used for a faster approximation. For
+    4D images the first volume is used.
+
+    Parameters:
+    nii_img (Nifti1Image or str): The image.
+    step (int, optional): Decimation factor along each axis.
+    slab_size (int, optional): Number of planes read at a time.
+
+    Returns:
+    ndarray: The voxel coordinates (i, j, k).
+    """
+    return _image_center_of_mass(load_img(nii_img), step, slab_size)
+
+
+def _image_center_of_mass(nii_img, step=1, slab_size=16):
+    if _volume_cache is not None:
+        return _volume_cache.center_of_mass(nii_img, step)
+    return _center_of_mass(nii_img.dataobj, step, slab_size)
+
+
+def _center_of_mass(data, step=1, slab_size=16):
+    shape = data.shape[:3]
+    frame = (0,) * (len(data.shape) - 3)
+    coords = [np.arange(0, n, step, dtype=np.float64) for n in shape]
+    total = 0.0
+    moments = np.zeros(3)
+    for start in range(0, shape[2], slab_size * step):
+        stop = min(start + slab_size * step, shape[2])
+        slab = np.asarray(
+            data[(slice(None, None, step),) * 2 + (slice(start, stop, step),) + frame]
+        )
+        total += slab.sum(dtype=np.float64)
+        moments[0] += slab.sum(axis=(1, 2), dtype=np.float64) @ coords[0]
+        moments[1] += slab.sum(axis=(0, 2), dtype=np.float64) @ coords[1]
+        moments[2] += slab.sum(axis=(0, 1), dtype=np.float64) @ np.arange(
+            start, stop, step, dtype=np.float64
+        )
+    return moments / total
+
+
+def get_cut_coords(nii_img, step=1):
+    """
+    Get the center of mass of a NIfTI image in real-world coordinates.
+
+    All three coordinates come from one pass over the image, see
+    get_center_of_mass for step.
+
+    Returns:
+    ndarray: The (x, y, z) coordinates in millimeters.
+    """
+    # Load the NIfTI image
+    nii_img = load_img(nii_img)
 
     # Calculate the center of mass in voxel coordinates
-    com_voxel = center_of_mass(data)
+    com_voxel = _image_center_of_mass(nii_img, step)
 
     # Get the affine matrix
     affine = nii_img.affine
@@ -29,15 +588,48 @@ def get_cut_coords(nii_img):
     return com_real_world
 
 
-def get_com_slice(nii_img, plane="sagittal"):
-    x, y, z = get_cut_coords(nii_img)
+def get_com_slice(nii_img, plane="sagittal", step=1):
+    """
+    Get the slice position through the center of mass for one or more planes.
 
-    if plane.lower() == "sagittal":
-        return x
-    elif plane.lower() == "coronal":
-        return y
-    elif plane.lower() == "horizontal":
-        return z
+    Parameters:
+    nii_img (Nifti1Image or str): The image.
+    plane (str or list, optional): The plane ("sagittal", "coronal",
+        "horizontal"), or a list of planes served by a single pass.
+    step (int, optional): Decimation factor, see get_center_of_mass.
+
+    Returns:
+    float or list: The slice position(s) in millimeters.
+    """
+    x, y, z = get_cut_coords(nii_img, step)
+    positions = {"sagittal": x, "coronal": y, "horizontal": z}
+
+    if isinstance(plane, str):
+        return positions.get(plane.lower())
+    return [positions.get(p.lower()) for p in plane]
+
+
+def get_overlay_cmap(overlay_img, cmap="auto"):
+    """
+    Choose the colormap and normalization of an overlay.
+
+    With cmap "auto", data with both signs get "RdBu_r" centred on zero,
+    all-negative data "Blues" and all-positive data "Reds".
+
+    Returns:
+    tuple: (cmap, norm), norm is None unless centred on zero.
+    """
+    if cmap != "auto":
+        return cmap, None
+    data_min, data_max = get_data_range(overlay_img)
+    if data_min < 0 and data_max > 0:
+        # Data has both negative and positive values
+        return "RdBu_r", mcolors.TwoSlopeNorm(vmin=data_min, vcenter=0, vmax=data_max)
+    elif data_max < 0:
+        # All data is negative
+        return "Blues", None
+    # All data is positive
+    return "Reds", None
 
 
 def plot_slice(
@@ -59,77 +651,22 @@ def plot_slice(
     zero2nan (bool, optional): Convert zeros to NaNs for transparency (default is True).
     plane (str, optional): The plane to plot ("sagittal", "coronal", "horizontal").
 
+    Images with rotated or sheared affines are resampled onto a world-aligned
+    grid, see SliceGrid.
+
     Returns:
     fig, ax: Matplotlib figure and axis objects.
     """
-    bg_data = bg_img.get_fdata()
+    bg_img = load_img(bg_img)
+    grid = SliceGrid.from_img(bg_img, plane, slice_mm)
+    img_slice = np.flipud(grid.sample(bg_img))
+    extent = grid.extent
+    _, column_axis, row_axis = PLANES[plane]
+    xlabel = AXIS_LABELS[column_axis]
+    ylabel = AXIS_LABELS[row_axis]
+
     if zero2nan:
-        bg_data = np.where(bg_data == 0, np.nan, bg_data)
-    affine = bg_img.affine
-
-    # Determine the slice index based on the selected plane
-    if plane == "sagittal":
-        slice_index = int(np.round((slice_mm - affine[0, 3]) / affine[0, 0]))
-        y_coords = np.linspace(0, bg_data.shape[1] - 1, bg_data.shape[1])
-        z_coords = np.linspace(0, bg_data.shape[2] - 1, bg_data.shape[2])
-        y_realworld = nib.affines.apply_affine(
-            affine,
-            np.column_stack(
-                [np.zeros_like(y_coords), y_coords, np.zeros_like(y_coords)]
-            ),
-        )[:, 1]
-        z_realworld = nib.affines.apply_affine(
-            affine,
-            np.column_stack(
-                [np.zeros_like(z_coords), np.zeros_like(z_coords), z_coords]
-            ),
-        )[:, 2]
-        img_slice = np.flipud(bg_data[slice_index, :, :].T)
-        extent = [y_realworld[0], y_realworld[-1], z_realworld[0], z_realworld[-1]]
-        xlabel = "Y (mm)"
-        ylabel = "Z (mm)"
-
-    elif plane == "coronal":
-        slice_index = int(np.round((slice_mm - affine[1, 3]) / affine[1, 1]))
-        x_coords = np.linspace(0, bg_data.shape[0] - 1, bg_data.shape[0])
-        z_coords = np.linspace(0, bg_data.shape[2] - 1, bg_data.shape[2])
-        x_realworld = nib.affines.apply_affine(
-            affine,
-            np.column_stack(
-                [x_coords, np.zeros_like(x_coords), np.zeros_like(x_coords)]
-            ),
-        )[:, 0]
-        z_realworld = nib.affines.apply_affine(
-            affine,
-            np.column_stack(
-                [np.zeros_like(z_coords), np.zeros_like(z_coords), z_coords]
-            ),
-        )[:, 2]
-        img_slice = np.flipud(bg_data[:, slice_index, :].T)
-        extent = [x_realworld[0], x_realworld[-1], z_realworld[0], z_realworld[-1]]
-        xlabel = "X (mm)"
-        ylabel = "Z (mm)"
-
-    elif plane == "horizontal":
-        slice_index = int(np.round((slice_mm - affine[2, 3]) / affine[2, 2]))
-        x_coords = np.linspace(0, bg_data.shape[0] - 1, bg_data.shape[0])
-        y_coords = np.linspace(0, bg_data.shape[1] - 1, bg_data.shape[1])
-        x_realworld = nib.affines.apply_affine(
-            affine,
-            np.column_stack(
-                [x_coords, np.zeros_like(x_coords), np.zeros_like(x_coords)]
-            ),
-        )[:, 0]
-        y_realworld = nib.affines.apply_affine(
-            affine,
-            np.column_stack(
-                [np.zeros_like(y_coords), y_coords, np.zeros_like(y_coords)]
-            ),
-        )[:, 1]
-        img_slice = np.flipud(bg_data[:, :, slice_index].T)
-        extent = [x_realworld[0], x_realworld[-1], y_realworld[0], y_realworld[-1]]
-        xlabel = "X (mm)"
-        ylabel = "Y (mm)"
+        img_slice = np.where(img_slice == 0, np.nan, img_slice)
 
     if not ax:
         fig, ax = plt.subplots(1, 1, figsize=(8, 8))
@@ -145,6 +682,7 @@ def plot_slice(
     ax.set_ylabel(ylabel)
     ax.set_aspect("equal")  # Aspect ratio of the plot
     ax.axis("on")  # Show axis with real-world coordinates
+    _slice_grids[ax] = grid
     return ax
 
 
@@ -180,98 +718,25 @@ def add_overlay(
     contour_levels (int or list, optional): Number or list of contour levels.
     contour_kwargs (dict, optional): Keyword arguments for the contour plot.
 
+    If ax shows a slice of the same plane and position from plot_slice, the
+    overlay is resampled onto the grid of that background slice.
+
     Returns:
     overlay: The overlay artist (either a QuadMesh or a ContourSet depending on the method used).
     """
     xlim, ylim = ax.get_xlim(), ax.get_ylim()
 
-    if isinstance(overlay_img, str):
-        overlay_img = nib.load(overlay_img)
-    overlay_data = overlay_img.get_fdata()
-    overlay_affine = overlay_img.affine
+    overlay_img = load_img(overlay_img)
 
     # Determine the colormap and normalization based on the data
-    if cmap == "auto":
-        if np.any(overlay_data < 0) and np.any(overlay_data > 0):
-            # Data has both negative and positive values
-            cmap = "RdBu_r"
-            norm = mcolors.TwoSlopeNorm(
-                vmin=np.min(overlay_data), vcenter=0, vmax=np.max(overlay_data)
-            )
-        elif np.all(overlay_data < 0):
-            # All data is negative
-            cmap = "Blues"
-            norm = None  # No need to center for all negative values
-        else:
-            # All data is positive
-            cmap = "Reds"
-            norm = None  # No need to center for all positive values
-    else:
-        norm = None
+    cmap, norm = get_overlay_cmap(overlay_img, cmap)
 
-    # Determine the slice index based on the selected plane
-    if plane == "sagittal":
-        slice_index = int(
-            np.round((slice_mm - overlay_affine[0, 3]) / overlay_affine[0, 0])
-        )
-        y_coords = np.linspace(0, overlay_data.shape[1] - 1, overlay_data.shape[1])
-        z_coords = np.linspace(0, overlay_data.shape[2] - 1, overlay_data.shape[2])
-        y_realworld = nib.affines.apply_affine(
-            overlay_affine,
-            np.column_stack(
-                [np.zeros_like(y_coords), y_coords, np.zeros_like(y_coords)]
-            ),
-        )[:, 1]
-        z_realworld = nib.affines.apply_affine(
-            overlay_affine,
-            np.column_stack(
-                [np.zeros_like(z_coords), np.zeros_like(z_coords), z_coords]
-            ),
-        )[:, 2]
-        overlay_slice = np.flipud(overlay_data[slice_index, :, :].T)
-        extent = [y_realworld[0], y_realworld[-1], z_realworld[0], z_realworld[-1]]
-
-    elif plane == "coronal":
-        slice_index = int(
-            np.round((slice_mm - overlay_affine[1, 3]) / overlay_affine[1, 1])
-        )
-        x_coords = np.linspace(0, overlay_data.shape[0] - 1, overlay_data.shape[0])
-        z_coords = np.linspace(0, overlay_data.shape[2] - 1, overlay_data.shape[2])
-        x_realworld = nib.affines.apply_affine(
-            overlay_affine,
-            np.column_stack(
-                [x_coords, np.zeros_like(x_coords), np.zeros_like(x_coords)]
-            ),
-        )[:, 0]
-        z_realworld = nib.affines.apply_affine(
-            overlay_affine,
-            np.column_stack(
-                [np.zeros_like(z_coords), np.zeros_like(z_coords), z_coords]
-            ),
-        )[:, 2]
-        overlay_slice = np.flipud(overlay_data[:, slice_index, :].T)
-        extent = [x_realworld[0], x_realworld[-1], z_realworld[0], z_realworld[-1]]
-
-    elif plane == "horizontal":
-        slice_index = int(
-            np.round((slice_mm - overlay_affine[2, 3]) / overlay_affine[2, 2])
-        )
-        x_coords = np.linspace(0, overlay_data.shape[0] - 1, overlay_data.shape[0])
-        y_coords = np.linspace(0, overlay_data.shape[1] - 1, overlay_data.shape[1])
-        x_realworld = nib.affines.apply_affine(
-            overlay_affine,
-            np.column_stack(
-                [x_coords, np.zeros_like(x_coords), np.zeros_like(x_coords)]
-            ),
-        )[:, 0]
-        y_realworld = nib.affines.apply_affine(
-            overlay_affine,
-            np.column_stack(
-                [np.zeros_like(y_coords), y_coords, np.zeros_like(y_coords)]
-            ),
-        )[:, 1]
-        overlay_slice = np.flipud(overlay_data[:, :, slice_index].T)
-        extent = [x_realworld[0], x_realworld[-1], y_realworld[0], y_realworld[-1]]
+    # Resample onto the grid of the background if it shows the same slice
+    grid = _slice_grids.get(ax)
+    if grid is None or not grid.matches(plane, slice_mm):
+        grid = SliceGrid.from_img(overlay_img, plane, slice_mm)
+    overlay_slice = np.flipud(grid.sample(overlay_img))
+    extent = grid.extent
 
     # Apply the threshold by creating a masked array
     if threshold is not None:
@@ -324,3 +789,114 @@ def add_overlay(
         ax.set_xlim(xlim)
         ax.set_ylim(ylim)
     return overlay
+
+
+def plot_mosaic(
+    bg_img,
+    overlay_img=None,
+    plane="horizontal",
+    slices=12,
+    ncols=6,
+    ax=None,
+    zero2nan=True,
+    alpha=0.9,
+    threshold=10**-6,
+    cmap="auto",
+    interpolation="gaussian",
+    annotate=True,
+):
+    """
+    Plot a montage of slices of a background image with an optional overlay.
+
+    Each image is read once and all slices are gathered from it in one go
+    (see SliceGrid.sample_stack), then tiled into a single image drawn with
+    one imshow per layer. The overlay is resampled onto the grid of the
+    background.
+
+    Parameters:
+    bg_img (Nifti1Image or str): The background image.
+    overlay_img (Nifti1Image or str, optional): The overlay image.
+    plane (str, optional): The plane to plot ("sagittal", "coronal", "horizontal").
+    slices (int or list, optional): Slice positions in millimeters, or the
+        number of evenly spaced slices through the background.
+    ncols (int, optional): Number of tiles per row.
+    ax (matplotlib.axes.Axes, optional): The axis to draw the montage on.
+    zero2nan (bool, optional): Convert zeros of the background to NaNs.
+    alpha, threshold, cmap, interpolation: As in add_overlay.
+    annotate (bool, optional): Label each tile with its slice position.
+
+    Returns:
+    ax: The matplotlib axis.
+    """
+    bg_img = load_img(bg_img)
+    normal_axis, _, _ = _plane_axes(plane)
+    if np.isscalar(slices):
+        corners = nib.affines.apply_affine(
+            bg_img.affine,
+            list(itertools.product(*[(0, n - 1) for n in bg_img.shape[:3]])),
+        )
+        low, high = corners[:, normal_axis].min(), corners[:, normal_axis].max()
+        slices = np.linspace(low, high, int(slices) + 2)[1:-1]
+    slices = np.asarray(slices, dtype=np.float64)
+    grid = SliceGrid.from_img(bg_img, plane, slices[0])
+    ncols = min(ncols, len(slices))
+    nrows = -(-len(slices) // ncols)
+
+    def montage(stack):
+        # orient tiles with u to the right and v up, then tile row by row
+        if grid.u[-1] < grid.u[0]:
+            stack = stack[:, :, ::-1]
+        if grid.v[-1] > grid.v[0]:
+            stack = stack[:, ::-1, :]
+        n, height, width = stack.shape
+        tiles = np.full((nrows * ncols, height, width), np.nan)
+        tiles[:n] = stack
+        tiles = tiles.reshape(nrows, ncols, height, width)
+        return tiles.transpose(0, 2, 1, 3).reshape(nrows * height, ncols * width)
+
+    bg_stack = grid.sample_stack(bg_img, slices)
+    if zero2nan:
+        bg_stack[bg_stack == 0] = np.nan
+    du = abs(grid.u[-1] - grid.u[0]) / max(len(grid.u) - 1, 1)
+    dv = abs(grid.v[-1] - grid.v[0]) / max(len(grid.v) - 1, 1)
+
+    height, width = bg_stack.shape[1:]
+    if not ax:
+        figsize = (2 * ncols, 2 * nrows * height * dv / (width * du))
+        fig, ax = plt.subplots(1, 1, figsize=figsize)
+    ax.imshow(
+        montage(bg_stack),
+        cmap="gray",
+        interpolation=interpolation,
+        aspect=dv / du,
+    )
+
+    if overlay_img is not None:
+        overlay_img = load_img(overlay_img)
+        overlay_cmap, norm = get_overlay_cmap(overlay_img, cmap)
+        overlay_stack = grid.sample_stack(overlay_img, slices)
+        if threshold is not None:
+            overlay_stack[np.abs(overlay_stack) < threshold] = np.nan
+        ax.imshow(
+            montage(overlay_stack),
+            cmap=overlay_cmap,
+            alpha=alpha,
+            interpolation=interpolation,
+            aspect=dv / du,
+            norm=norm,
+        )
+
+    if annotate:
+        label = AXIS_LABELS[normal_axis][0].lower()
+        for i, slice_mm in enumerate(slices):
+            row, col = divmod(i, ncols)
+            ax.text(
+                col * width + 1,
+                row * height + 1,
+                f"{label}={slice_mm:.0f}",
+                color="w",
+                fontsize=8,
+                va="top",
+            )
+    ax.axis("off")
+    return ax
@@ -1,8 +1,19 @@
+import hashlib
+import os
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import cm
-from matplotlib.collections import PolyCollection, RegularPolyCollection
-from matplotlib.colors import Normalize
+from matplotlib.animation import FuncAnimation
+from matplotlib.collections import PathCollection, PolyCollection, RegularPolyCollection
+from matplotlib.colors import Normalize, to_rgba_array
+from matplotlib.path import Path
+from scipy.sparse import csr_matrix, identity, load_npz, save_npz
+from scipy.sparse.csgraph import connected_components
 
 
 def normalize_v3(arr):
@@ -14,19 +25,22 @@ def normalize_v3(arr):
     return arr
 
 
-def normal_vectors(vertices, faces):
-    norm = np.zeros(vertices.shape, dtype=vertices.dtype)
-    tris = vertices[faces]
-    n = np.cross(tris[::, 1] - tris[::, 0], tris[::, 2] - tris[::, 0])
+def normal_vectors(vertices, faces, chunk_size=2**16):
+    """Unit normals of faces, computed in chunks of faces so that
+    vertices[faces] is never materialized for the whole mesh"""
+    n = np.empty((len(faces), 3), dtype=np.result_type(vertices.dtype, np.float32))
+    for start in range(0, len(faces), chunk_size):
+        tris = vertices[faces[start : start + chunk_size]]
+        n[start : start + chunk_size] = np.cross(
+            tris[::, 1] - tris[::, 0], tris[::, 2] - tris[::, 0]
+        )
     n = normalize_v3(n)
     return n
 
 
 def vertex_normals(vertices, faces):
     norm = np.zeros(vertices.shape, dtype=vertices.dtype)
-    tris = vertices[faces]
-    n = np.cross(tris[::, 1] - tris[::, 0], tris[::, 2] - tris[::, 0])
-    n = normalize_v3(n)
+    n = normal_vectors(vertices, faces)
     norm[faces[:, 0]] += n
     norm[faces[:, 1]] += n
     norm[faces[:, 2]] += n
@@ -81,12 +95,16 @@ def zrotate(theta):
     )
 
 
-def shading_intensity(vertices, faces, light=np.array([0, 0, 1]), shading=0.7):
+def shading_intensity(
+    vertices, faces, light=np.array([0, 0, 1]), shading=0.7, face_normals=None
+):
     """shade calculation based on light source
     default is vertical light.
     shading controls amount of shading.
-    Also saturates so top 20 % of vertices all have max intensity."""
-    face_normals = normal_vectors(vertices, faces)
+    Also saturates so top 20 % of vertices all have max intensity.
+    Precomputed face_normals can be passed to skip recomputing them."""
+    if face_normals is None:
+        face_normals = normal_vectors(vertices, faces)
     intensity = np.dot(face_normals, light)
     intensity[np.isnan(intensity)] = 1
     shading = 0.7
@@ -100,48 +118,104 @@ def shading_intensity(vertices, faces, light=np.array([0, 0, 1]), shading=0.7):
     return intensity
 
 
-def f7(seq):
-    # returns uniques but in order to retain neighbour triangle relationship
-    seen = set()
-    seen_add = seen.add
-    return [x for x in seq if not (x in seen or seen_add(x))]
-
-
 def get_ring_of_neighbours(island, neighbours, vertex_indices=None, ordered=False):
     """Calculate ring of neighbouring vertices for an island of cortex
-    If ordered, then vertices will be returned in connected order"""
-    if not vertex_indices:
-        vertex_indices = np.arange(len(island))
-    if not ordered:
-
-        neighbours_island = neighbours[island]
-        unfiltered_neighbours = []
-        for n in neighbours_island:
-            unfiltered_neighbours.extend(n)
-        unique_neighbours = np.setdiff1d(
-            np.unique(unfiltered_neighbours), vertex_indices[island]
-        )
-        return unique_neighbours
+    island is a boolean mask (or index array) over vertices and neighbours
+    the sparse adjacency matrix from get_neighbours_from_tris.
+    Returns the indices of vertices adjacent to, but not part of, the island.
+    If ordered, they are returned in connected order, walking one loop of
+    the ring after the other."""
+    n_vert = neighbours.shape[0]
+    island = np.asarray(island)
+    if island.dtype != bool:
+        island = np.isin(np.arange(n_vert), island)
+    touched = neighbours @ island[:n_vert].astype(np.float32) > 0
+    ring = np.flatnonzero(touched & ~island[:n_vert])
+    if ordered:
+        ring = ring[_walk_ring(neighbours[ring][:, ring])]
+    if vertex_indices is not None:
+        ring = np.asarray(vertex_indices)[ring]
+    return ring
 
 
-def get_neighbours_from_tris(tris, label=None):
+def _walk_ring(adjacency):
+    """Order the vertices of a ring along its edges, given the sparse
+    adjacency among them. Each step goes to the unvisited neighbour with the
+    fewest unvisited neighbours, so shortcuts across the ring are not taken
+    early; a walk that ends starts again at the first unvisited vertex."""
+    indptr, indices = adjacency.indptr, adjacency.indices
+    n = len(indptr) - 1
+    visited = np.zeros(n, dtype=bool)
+    n_free = np.diff(indptr)
+    order = []
+    for start in range(n):
+        current = start
+        while current >= 0 and not visited[current]:
+            visited[current] = True
+            order.append(current)
+            candidates = indices[indptr[current] : indptr[current + 1]]
+            n_free[candidates] -= 1
+            candidates = candidates[~visited[candidates]]
+            if len(candidates):
+                current = candidates[np.argmin(n_free[candidates])]
+            else:
+                current = -1
+    return np.array(order, dtype=int)
+
+
+def get_neighbours_from_tris(tris, label=None, n_vert=None):
     """Get surface neighbours from tris
     Input: tris
-     Returns Nested list. Each list corresponds
-    to the ordered neighbours for the given vertex"""
-    n_vert = np.max(tris + 1)
-    neighbours = [[] for i in range(n_vert)]
-    for tri in tris:
-        neighbours[tri[0]].extend([tri[1], tri[2]])
-        neighbours[tri[2]].extend([tri[0], tri[1]])
-        neighbours[tri[1]].extend([tri[2], tri[0]])
-    # Get unique neighbours
-    for k in range(len(neighbours)):
-        if label is not None:
-            neighbours[k] = set(neighbours[k]).intersection(label)
-        else:
-            neighbours[k] = f7(neighbours[k])
-    return np.array(neighbours, dtype=object)
+    Returns symmetric scipy.sparse CSR adjacency matrix (n_vert, n_vert).
+    Row k holds the neighbours of vertex k in its indices, so
+    neighbours.indices[neighbours.indptr[k]:neighbours.indptr[k + 1]]
+    are the (sorted) neighbours of vertex k.
+    If label is given, only neighbours within label are kept."""
+    tris = np.asarray(tris, dtype=np.int64)
+    if n_vert is None:
+        n_vert = int(tris.max()) + 1
+    # every directed edge of every triangle, encoded as a single integer key
+    rows = tris[:, [0, 0, 1, 1, 2, 2]].ravel()
+    cols = tris[:, [1, 2, 0, 2, 0, 1]].ravel()
+    keys = np.unique(rows * n_vert + cols)
+    rows, cols = np.divmod(keys, n_vert)
+    if label is not None:
+        keep = np.isin(cols, label)
+        rows, cols = rows[keep], cols[keep]
+    indptr = np.zeros(n_vert + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_vert), out=indptr[1:])
+    return csr_matrix(
+        (np.ones(len(cols), dtype=np.float32), cols, indptr), shape=(n_vert, n_vert)
+    )
+
+
+def reduce_vertex_values(values, faces, method="mean", default=None):
+    """Reduce per-vertex values to one value per face.
+
+    method is "mean", "min", "max", "median" or "majority". All are
+    elementwise operations on the values at the three corners, the median
+    of three is far faster this way than np.median along an axis of three.
+    "majority" is meant for labels: the value shared by at least two
+    corners, or default where all three differ (the value at the first
+    corner if None). The mean is summed in float64, so that boolean and
+    small integer values neither saturate nor wrap around."""
+    a, b, c = (values[faces[:, k]] for k in range(3))
+    if method == "mean":
+        return (np.add(a, b, dtype=np.float64) + c) / 3
+    if method == "min":
+        return np.minimum(np.minimum(a, b), c)
+    if method == "max":
+        return np.maximum(np.maximum(a, b), c)
+    if method == "median":
+        return np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+    if method == "majority":
+        if default is None:
+            return np.where((a != b) & (b == c), b, a)
+        return np.where((a == b) | (a == c), a, np.where(b == c, b, default))
+    raise ValueError(
+        f"Unknown method '{method}', use 'mean', 'min', 'max', 'median' or "
+        "'majority'."
+    )
 
 
 def mask_colours(colours, triangles, mask, mask_colour=None):
@@ -154,6 +228,43 @@ def mask_colours(colours, triangles, mask, mask_colour=None):
     return colours
 
 
+def dilate_vertices(mask, neighbours, hops=1):
+    """Grow a boolean vertex mask by hops steps along the sparse adjacency"""
+    mask = np.asarray(mask, dtype=bool)
+    for _ in range(hops):
+        mask = mask | (neighbours @ mask.astype(np.float32) > 0)
+    return mask
+
+
+def erode_vertices(mask, neighbours, hops=1):
+    """Shrink a boolean vertex mask by hops steps along the sparse adjacency"""
+    return ~dilate_vertices(~np.asarray(mask, dtype=bool), neighbours, hops)
+
+
+def label_clusters(mask, neighbours):
+    """Connected components of a boolean vertex mask.
+    Returns per-vertex cluster labels (-1 outside the mask) and the number
+    of clusters."""
+    idx = np.flatnonzero(mask)
+    n_clusters, sub_labels = connected_components(
+        neighbours[idx][:, idx], directed=False
+    )
+    labels = np.full(neighbours.shape[0], -1)
+    labels[idx] = sub_labels
+    return labels, n_clusters
+
+
+def _grow_labels(labels, neighbours, hops):
+    """Hand cluster labels on to unlabelled neighbours, one hop at a time"""
+    rows = np.repeat(np.arange(neighbours.shape[0]), np.diff(neighbours.indptr))
+    cols = neighbours.indices
+    labels = labels.copy()
+    for _ in range(hops):
+        grow = (labels[cols] >= 0) & (labels[rows] < 0)
+        np.maximum.at(labels, rows[grow], labels[cols[grow]])
+    return labels
+
+
 def adjust_colours_pvals(
     colours,
     pvals,
@@ -161,23 +272,54 @@ def adjust_colours_pvals(
     mask=None,
     mask_colour=None,
     border_colour=np.array([1.0, 0, 0, 1]),
+    neighbours=None,
+    threshold=0.05,
+    ring_width=2,
+    return_clusters=False,
 ):
-    """red ring around clusters and greying out non-significant vertices"""
+    """red ring around clusters and greying out non-significant vertices
+
+    The ring spans ring_width hops outside each cluster and ring_width - 1
+    hops inside it. border_colour is a single RGBA colour or an (n, 4) array,
+    in which case the connected clusters cycle through the colours.
+    If return_clusters, also returns a dict with the per-vertex cluster
+    labels (-1 if not significant), the number of vertices, minimum p-value
+    and peak vertex of each cluster."""
     colours = mask_colours(colours, triangles, mask, mask_colour)
-    neighbours = get_neighbours_from_tris(triangles)
-    ring = get_ring_of_neighbours(pvals < 0.05, neighbours)
-    if len(ring) > 0:
-        ring_label = np.zeros(len(neighbours)).astype(bool)
-        ring_label[ring] = 1
-        ring = get_ring_of_neighbours(ring_label, neighbours)
-        ring_label[ring] = 1
-        colours[ring_label[triangles].any(axis=1), :] = border_colour
-    grey_out = pvals < 0.05
-    verts_grey_out = grey_out[triangles].any(axis=1)
+    if neighbours is None:
+        neighbours = get_neighbours_from_tris(triangles, n_vert=len(pvals))
+    significant = pvals < threshold
+    cluster_labels, n_clusters = label_clusters(significant, neighbours)
+    ring = dilate_vertices(significant, neighbours, ring_width) & ~erode_vertices(
+        significant, neighbours, ring_width - 1
+    )
+    if ring.any():
+        border_colour = np.atleast_2d(border_colour)
+        ring_labels = np.where(
+            ring, _grow_labels(cluster_labels, neighbours, ring_width), -1
+        )[triangles].max(axis=1)
+        ring_faces = ring_labels >= 0
+        colours[ring_faces, :] = border_colour[
+            ring_labels[ring_faces] % len(border_colour)
+        ]
+    verts_grey_out = significant[triangles].any(axis=1)
     colours[verts_grey_out, :] = (
         1.5 * colours[verts_grey_out] + np.array([0.86, 0.86, 0.86, 1])
     ) / 2.5
-    return colours
+    if not return_clusters:
+        return colours
+    # per-cluster statistics from the labelling above
+    in_cluster = cluster_labels[significant]
+    cluster_pvals = pvals[significant]
+    order = np.lexsort((cluster_pvals, in_cluster))
+    _, first = np.unique(in_cluster[order], return_index=True)
+    clusters = {
+        "labels": cluster_labels,
+        "n_vertices": np.bincount(in_cluster, minlength=n_clusters),
+        "min_pval": cluster_pvals[order][first],
+        "peak_vertex": np.flatnonzero(significant)[order][first],
+    }
+    return colours, clusters
 
 
 def add_parcellation_colours(
@@ -189,50 +331,43 @@ def add_parcellation_colours(
     filled=False,
     mask_colour=None,
     neighbours=None,
+    border_triangles=None,
 ):
-    """delineate regions"""
+    """delineate regions
+    A face is coloured with a roi's label colour when at least two of its
+    vertices lie on the border of that roi, i.e. are shared with a face whose
+    vertices carry different parcel labels. Borders are found in a single
+    pass over border_triangles, all faces of the mesh, which defaults to
+    triangles; pass the full faces when triangles only hold the drawn ones.
+    neighbours is no longer needed and only kept for backwards
+    compatibility."""
     colours = mask_colours(colours, triangles, mask, mask_colour=mask_colour)
     # normalise rois and colors
-    rois = list(set(parcel))
-    if 0 in rois:
-        rois.remove(0)
+    rois = np.unique(parcel)
+    rois = rois[rois != 0]
     if labels is None:
         labels = dict(zip(rois, np.random.rand(len(rois), 4)))
-    # remove transparent rois
-    # find vertices that delineate rois
     if filled:
         colours = np.zeros_like(colours)
-        for l, label in enumerate(rois):
-            colours[np.median(parcel[triangles], axis=1) == label] = labels[label]
+    if len(rois) == 0:
         return colours
-    if neighbours is None:
-        neighbours = get_neighbours_from_tris(triangles)
-    matrix_colored = np.zeros([len(triangles), len(rois)])
-    for l, label in enumerate(rois):
-        ring = get_ring_of_neighbours(parcel != label, neighbours)
-        if len(ring) > 0:
-            ring_label = np.zeros(len(neighbours)).astype(bool)
-            ring_label[ring] = 1
-            #          ring=get_ring_of_neighbours(ring_label,neighbours)
-            #           ring_label[ring]=1
-            #            matrix_colored[:,l] = ring_label[triangles].sum(axis=1)
-            matrix_colored[:, l] = np.median(
-                ring_label[triangles], axis=1
-            )  # ring_label[triangles].sum(axis=1)
-    # update colours with delineation
-    maxis = [max(matrix_colored[i, :]) for i in range(0, len(colours))]
-    colours = np.array(
-        [
-            (
-                labels[
-                    rois[np.random.choice(np.where(matrix_colored[i, :] == maxi)[0])]
-                ]
-                if maxi != 0
-                else colours[i]
-            )
-            for i, maxi in enumerate(maxis)
-        ]
-    )
+    roi_colours = np.array([labels[roi] for roi in rois])
+    if filled:
+        face_label = reduce_vertex_values(parcel, triangles, "majority")
+    else:
+        # find vertices that delineate rois
+        if border_triangles is None:
+            border_triangles = triangles
+        mixed = reduce_vertex_values(parcel, border_triangles, "min") != (
+            reduce_vertex_values(parcel, border_triangles, "max")
+        )
+        border = np.zeros(len(parcel), dtype=bool)
+        border[border_triangles[mixed].ravel()] = True
+        face_label = reduce_vertex_values(
+            np.where(border, parcel, 0), triangles, "majority", default=0
+        )
+    coloured = face_label != 0
+    colours[coloured] = roi_colours[np.searchsorted(rois, face_label[coloured])]
     return colours
 
 
@@ -274,11 +409,1539 @@ def normalized(a, axis=-1, order=2):
     return a / np.expand_dims(l2, axis)
 
 
-def plot_surf(
+class SurfaceMesh:
+    """Surface mesh whose derived geometry is computed lazily and memoized.
+
+    Normalized coordinates, face and vertex normals, the vertex adjacency and
+    the shading intensity per light source are each computed on first use and
+    then reused, so repeated plot_surf calls on the same mesh only pay for the
+    overlay-dependent work. Decimated versions for previews are cached per
+    target face count, see decimate.
+
+    Parameters:
+    -----------
+    vertices : (n_vertices, 3) array
+        Vertex coordinates.
+    faces : (n_faces, 3) array
+        Triangles as vertex indices.
+    """
+
+    def __init__(self, vertices, faces):
+        self.coordinates = np.asarray(vertices)
+        self.faces = np.asarray(faces, dtype=int)
+        self._shading = {}
+        self._decimated = {}
+        self._sampling = {}
+        # set on decimated meshes: cluster of every vertex of the parent mesh
+        self.vertex_map = None
+
+    @property
+    def n_vertices(self):
+        return len(self.coordinates)
+
+    @property
+    def n_faces(self):
+        return len(self.faces)
+
+    @cached_property
+    def vertices(self):
+        """Coordinates centred on the origin and scaled to unit extent."""
+        vertices = self.coordinates.astype(np.float32)
+        return (vertices - (vertices.max(0) + vertices.min(0)) / 2) / max(
+            vertices.max(0) - vertices.min(0)
+        )
+
+    @cached_property
+    def face_normals(self):
+        return normal_vectors(self.vertices, self.faces)
+
+    @cached_property
+    def vertex_normals(self):
+        return vertex_normals(self.vertices, self.faces)
+
+    @cached_property
+    def neighbours(self):
+        """Sparse vertex adjacency, see get_neighbours_from_tris."""
+        return get_neighbours_from_tris(self.faces, n_vert=self.n_vertices)
+
+    @cached_property
+    def smoothing_operator(self):
+        """Sparse operator averaging every vertex with its neighbours, the
+        row-normalized adjacency plus identity, see smooth_overlay."""
+        operator = (self.neighbours + identity(self.n_vertices, format="csr")).tocsr()
+        operator = operator.astype(np.float64)
+        operator.data /= np.repeat(np.diff(operator.indptr), np.diff(operator.indptr))
+        return operator
+
+    def shading_intensity(self, light=np.array([0, 0, 1]), shading=0.7):
+        """Memoized shading_intensity for the given light direction."""
+        key = (tuple(np.round(np.asarray(light, dtype=float), 12)), shading)
+        if key not in self._shading:
+            self._shading[key] = shading_intensity(
+                self.vertices,
+                self.faces,
+                light=light,
+                shading=shading,
+                face_normals=self.face_normals,
+            )
+        return self._shading[key]
+
+    def sampling_matrix(self, affine, shape, interpolation="linear", cache_dir=None):
+        """Memoized volume_sampling_matrix of the vertex coordinates for a
+        volume with this affine and shape. With cache_dir the matrix is
+        also stored there as .npz and reused across sessions."""
+        affine = np.asarray(affine, dtype=np.float64)
+        shape = tuple(int(n) for n in shape[:3])
+        key = (affine.tobytes(), shape, interpolation)
+        filename = None
+        if cache_dir is not None:
+            digest = hashlib.sha1(
+                np.ascontiguousarray(self.coordinates, dtype=np.float64)
+            )
+            digest.update(repr(key).encode())
+            filename = os.path.join(cache_dir, f"{digest.hexdigest()}.npz")
+        if key not in self._sampling:
+            if filename is not None and os.path.exists(filename):
+                self._sampling[key] = load_npz(filename).tocsr()
+            else:
+                self._sampling[key] = volume_sampling_matrix(
+                    self.coordinates, affine, shape, interpolation
+                )
+        if filename is not None and not os.path.exists(filename):
+            os.makedirs(cache_dir, exist_ok=True)
+            save_npz(filename, self._sampling[key])
+        return self._sampling[key]
+
+    def save_arrays(self, directory):
+        """Write coordinates, faces and the cached geometry and adjacency
+        as .npy files in directory, see load_arrays."""
+        neighbours = self.neighbours
+        arrays = {
+            "coordinates": self.coordinates,
+            "faces": self.faces,
+            "vertices": self.vertices,
+            "face_normals": self.face_normals,
+            "neighbours_data": neighbours.data,
+            "neighbours_indices": neighbours.indices,
+            "neighbours_indptr": neighbours.indptr,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+
+    @classmethod
+    def load_arrays(cls, directory, mmap_mode="r"):
+        """Mesh written by save_arrays, memory-mapped by default so that
+        processes loading the same directory share one copy of the arrays
+        and nothing is recomputed."""
+
+        def load(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        mesh = cls(load("coordinates"), load("faces"))
+        mesh.vertices = load("vertices")
+        mesh.face_normals = load("face_normals")
+        mesh.neighbours = csr_matrix(
+            (
+                load("neighbours_data"),
+                load("neighbours_indices"),
+                load("neighbours_indptr"),
+            ),
+            shape=(mesh.n_vertices, mesh.n_vertices),
+        )
+        return mesh
+
+    def decimate(self, n_faces):
+        """Decimated mesh with roughly n_faces faces, memoized per n_faces.
+
+        Vertices are clustered on a uniform grid whose cells hold about two
+        faces each, every cluster becomes one vertex at the mean position of
+        its members, and collapsed or duplicate faces are dropped. Meant for
+        previews where the original faces would be smaller than a pixel.
+        Returns the mesh itself if it has no more than n_faces faces.
+        """
+        n_faces = int(n_faces)
+        if n_faces <= 0:
+            raise ValueError(f"n_faces must be positive, got {n_faces}.")
+        if n_faces >= self.n_faces:
+            return self
+        if n_faces not in self._decimated:
+            tris = self.vertices[self.faces]
+            area = (
+                0.5
+                * np.linalg.norm(
+                    np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0]), axis=1
+                ).sum()
+            )
+            cell = np.sqrt(2 * area / n_faces)
+            keys = np.floor((self.vertices - self.vertices.min(0)) / cell).astype(
+                np.int64
+            )
+            shape = keys.max(0) + 1
+            code = keys[:, 0] + shape[0] * (keys[:, 1] + shape[1] * keys[:, 2])
+            _, representatives, vertex_map = np.unique(
+                code, return_index=True, return_inverse=True
+            )
+            n_clusters = len(representatives)
+            counts = np.bincount(vertex_map, minlength=n_clusters)
+            coordinates = (
+                np.stack(
+                    [
+                        np.bincount(vertex_map, self.coordinates[:, k], n_clusters)
+                        for k in range(3)
+                    ],
+                    axis=1,
+                )
+                / counts[:, np.newaxis]
+            )
+            faces = vertex_map[self.faces]
+            a, b, c = faces.T
+            faces = faces[(a != b) & (b != c) & (a != c)]
+            _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+            mesh = SurfaceMesh(coordinates, faces[np.sort(first)])
+            mesh.vertex_map = vertex_map
+            mesh._representatives = representatives
+            mesh._averaging = csr_matrix(
+                (1 / counts[vertex_map], (vertex_map, np.arange(self.n_vertices))),
+                shape=(n_clusters, self.n_vertices),
+            )
+            self._decimated[n_faces] = mesh
+        return self._decimated[n_faces]
+
+    def downsample(self, values, label=False):
+        """Map per-vertex values of the parent mesh onto this decimated mesh.
+        Values are averaged over each cluster, labels (and masks or p-values)
+        are taken from one representative vertex per cluster."""
+        if values is None or self.vertex_map is None:
+            return values
+        if label:
+            return np.asarray(values)[self._representatives]
+        return self._averaging @ np.asarray(values, dtype=float)
+
+
+def smooth_overlay(mesh, values, iterations=None, fwhm=None):
+    """Smooth per-vertex values along the surface.
+
+    Every iteration replaces each value by the mean over the vertex and its
+    neighbours, one sparse matrix product with the cached
+    SurfaceMesh.smoothing_operator, so a 2D array of maps is smoothed in one
+    pass per iteration.
+
+    Parameters:
+    -----------
+    mesh : SurfaceMesh or (vertices, faces)
+    values : (n_vertices,) or (n_vertices, n_maps) array
+        Values to smooth, NaNs spread to their neighbours.
+    iterations : int, optional
+        Number of averaging steps.
+    fwhm : float, optional
+        Full width at half maximum of the smoothing kernel in the units of
+        the vertex coordinates, instead of iterations. Each step is treated
+        as a random walk step along an edge of mean squared length, which
+        gives the number of iterations for a Gaussian of this width.
+
+    Returns:
+    --------
+    smoothed : array of the shape of values
+    """
+    if not isinstance(mesh, SurfaceMesh):
+        mesh = SurfaceMesh(*mesh)
+    if (iterations is None) == (fwhm is None):
+        raise ValueError("Give either iterations or fwhm.")
+    operator = mesh.smoothing_operator
+    if fwhm is not None:
+        neighbours = mesh.neighbours
+        rows = np.repeat(np.arange(mesh.n_vertices), np.diff(neighbours.indptr))
+        coordinates = np.asarray(mesh.coordinates, dtype=np.float64)
+        edge_length2 = np.mean(
+            np.sum((coordinates[rows] - coordinates[neighbours.indices]) ** 2, axis=1)
+        )
+        degree = neighbours.nnz / mesh.n_vertices
+        # variance along each surface axis added by one averaging step
+        step_variance = degree * edge_length2 / (2 * (degree + 1))
+        iterations = int(np.round(fwhm**2 / (8 * np.log(2)) / step_variance))
+    smoothed = np.asarray(values, dtype=np.float64)
+    for _ in range(iterations):
+        smoothed = operator @ smoothed
+    return smoothed
+
+
+def volume_sampling_matrix(coordinates, affine, shape, interpolation="linear"):
+    """Sparse (n_points, n_voxels) matrix sampling a volume at world
+    coordinates, e.g. the vertices of a surface in the space of the affine.
+
+    Voxels are numbered in Fortran order, as in
+    data.reshape(n_voxels, -1, order="F"). interpolation is "linear" for
+    trilinear weights of the eight surrounding voxels or "nearest". Voxels
+    outside the volume get no weight, so points outside it sample zero.
+    """
+    if interpolation not in ("linear", "nearest"):
+        raise ValueError(
+            f"Unknown interpolation '{interpolation}', use 'linear' or 'nearest'."
+        )
+    shape = np.array(shape[:3])
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    inverse = np.linalg.inv(np.asarray(affine, dtype=np.float64))
+    ijk = coordinates @ inverse[:3, :3].T + inverse[:3, 3]
+    n_points = len(ijk)
+    if interpolation == "nearest":
+        corners = np.round(ijk).astype(np.int64)[np.newaxis]
+        weights = np.ones((1, n_points))
+    else:
+        base = np.floor(ijk).astype(np.int64)
+        frac = ijk - base
+        offsets = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+        corners = base[np.newaxis] + offsets[:, np.newaxis]
+        weights = np.prod(
+            np.where(offsets[:, np.newaxis], frac[np.newaxis], 1 - frac[np.newaxis]),
+            axis=2,
+        )
+    inside = np.all((corners >= 0) & (corners < shape), axis=2) & (weights > 0)
+    corners = corners[inside]
+    columns = corners[:, 0] + shape[0] * (corners[:, 1] + shape[1] * corners[:, 2])
+    rows = np.broadcast_to(np.arange(n_points), inside.shape)[inside]
+    return csr_matrix(
+        (weights[inside], (rows, columns)), shape=(n_points, int(np.prod(shape)))
+    )
+
+
+def vol_to_surf(img, mesh, interpolation="linear", cache_dir=None):
+    """Sample a volume at the vertices of a surface in the same world space.
+
+    The sparse sampling matrix is built once per mesh, affine, shape and
+    interpolation and memoized on the mesh (and in cache_dir if given, see
+    SurfaceMesh.sampling_matrix), so every further volume costs one sparse
+    matrix product. All frames of a 4D volume are sampled in that one
+    product.
+
+    Parameters:
+    -----------
+    img : nibabel image or str
+        Volume, e.g. a NIfTI statistical map, or its filename.
+    mesh : SurfaceMesh or (vertices, faces)
+        Surface with vertex coordinates in the world space of img.
+    interpolation : str
+        "linear" (trilinear) or "nearest".
+    cache_dir : str, optional
+        Directory to store sampling matrices in across sessions.
+
+    Returns:
+    --------
+    values : (n_vertices,) or (n_vertices, n_frames) array
+    """
+    if isinstance(img, (str, os.PathLike)):
+        import nibabel as nib
+
+        img = nib.load(img)
+    if not isinstance(mesh, SurfaceMesh):
+        mesh = SurfaceMesh(*mesh)
+    data = np.asanyarray(img.dataobj)
+    matrix = mesh.sampling_matrix(img.affine, data.shape, interpolation, cache_dir)
+    values = matrix @ data.reshape(matrix.shape[1], -1, order="F")
+    if data.ndim == 3:
+        return values[:, 0]
+    return values.reshape((mesh.n_vertices,) + data.shape[3:], order="F")
+
+
+VIEWS = {
+    # name: (rotation about the vertical axis, x_rotate or None to keep it)
+    "lateral": (90, None),
+    "medial": (270, None),
+    "anterior": (180, None),
+    "posterior": (0, None),
+    "dorsal": (0, 0),
+    "ventral": (0, 180),
+}
+
+
+def resolve_view(view, x_rotate=270):
+    """Turn a view name from VIEWS or a rotation angle into (view, x_rotate)"""
+    if isinstance(view, str):
+        view, view_x_rotate = VIEWS[view]
+        if view_x_rotate is not None:
+            x_rotate = view_x_rotate
+    return view, x_rotate
+
+
+def mvp_matrix(view, x_rotate=270, z_rotate=0, flat_map=False):
+    """Model-view-projection matrix for the camera of a view"""
+    return (
+        perspective(25, 1, 1, 100)
+        @ translate(0, 0, -3)
+        @ yrotate(view)
+        @ zrotate(z_rotate)
+        @ xrotate(x_rotate)
+        @ zrotate(270 * flat_map)
+    )
+
+
+def light_intensity(mesh, z_rotate=0, flat_map=False):
+    """Per-face shading intensity, the light source follows z_rotate"""
+    if flat_map:
+        return np.ones(mesh.n_faces)
+    # change light source if z is rotate
+    light = np.array([0, 0, 1, 1]) @ yrotate(z_rotate)
+    return mesh.shading_intensity(light[:3], shading=0.7)
+
+
+def overlay_colours(
+    mesh,
+    overlay,
+    cmap="viridis",
+    label=False,
+    vmax=None,
+    vmin=None,
+    pvals=None,
+    mask=None,
+    mask_colour=None,
+    border_colour=np.array([1, 0, 0, 1]),
+    alpha_colour=None,
+    neighbours=None,
+    parcel=None,
+    parcel_cmap=None,
+    filled_parcels=False,
+    ring_width=2,
+):
+    """Per-face RGBA colours of a vertex overlay, before shading.
+    Returns the colours and the vmin, vmax of the colour scale."""
+    F = mesh.faces
+    # colours smoothed (mean) or majority vote if label
+    colours = reduce_vertex_values(overlay, F, "majority" if label else "mean")
+    if vmax is not None:
+        colours = (colours - vmin) / (vmax - vmin)
+        colours = np.clip(colours, 0, 1)
+    else:
+        vmax = colours.max()
+        vmin = colours.min()
+        colours = (colours - colours.min()) / (colours.max() - colours.min())
+    C = plt.get_cmap(cmap)(colours)
+    if alpha_colour is not None:
+        C = adjust_colours_alpha(C, reduce_vertex_values(alpha_colour, F))
+    C = annotate_colours(
+        C,
+        mesh,
+        F,
+        pvals=pvals,
+        mask=mask,
+        mask_colour=mask_colour,
+        border_colour=border_colour,
+        neighbours=neighbours,
+        parcel=parcel,
+        parcel_cmap=parcel_cmap,
+        filled_parcels=filled_parcels,
+        ring_width=ring_width,
+    )
+    return C, vmin, vmax
+
+
+def annotate_colours(
+    colours,
+    mesh,
+    triangles,
+    pvals=None,
+    mask=None,
+    mask_colour=None,
+    border_colour=np.array([1, 0, 0, 1]),
+    neighbours=None,
+    parcel=None,
+    parcel_cmap=None,
+    filled_parcels=False,
+    ring_width=2,
+):
+    """Draw the mask, p-value rings and parcel outlines over face colours.
+
+    colours are the colours of triangles, all faces of mesh or a subset of
+    them; clusters and parcel borders are always found on the whole mesh.
+    None of these depend on the overlay, so each face ends up with either
+    its own colour, a fixed colour or its colour greyed out."""
+    if parcel is not None:
+        if parcel.sum() == 0:
+            parcel = None
+    if neighbours is None and pvals is not None:
+        neighbours = mesh.neighbours
+    if pvals is not None:
+        colours = adjust_colours_pvals(
+            colours,
+            pvals,
+            triangles,
+            mask,
+            mask_colour=mask_colour,
+            border_colour=border_colour,
+            neighbours=neighbours,
+            ring_width=ring_width,
+        )
+    elif mask is not None:
+        colours = mask_colours(colours, triangles, mask, mask_colour=mask_colour)
+    if parcel is not None:
+        colours = add_parcellation_colours(
+            colours,
+            parcel,
+            triangles,
+            parcel_cmap,
+            mask,
+            mask_colour=mask_colour,
+            filled=filled_parcels,
+            border_triangles=mesh.faces,
+        )
+    return colours
+
+
+def fused_overlay_colours(
+    mesh,
+    overlay,
+    order=None,
+    intensity=None,
+    cmap="viridis",
+    label=False,
+    vmax=None,
+    vmin=None,
+    pvals=None,
+    mask=None,
+    mask_colour=None,
+    border_colour=np.array([1, 0, 0, 1]),
+    alpha_colour=None,
+    neighbours=None,
+    parcel=None,
+    parcel_cmap=None,
+    filled_parcels=False,
+    ring_width=2,
+    chunk_size=2**16,
+):
+    """Low-memory overlay_colours with shading, for very large meshes.
+
+    Colours are only computed for the faces in order (all faces if None)
+    and are written into a single float32 array in chunks of chunk_size
+    faces: colour map lookup, alpha, masking and shading by intensity
+    (one value per face of order) are applied in place on each chunk.
+    p-value rings and parcellations are added afterwards on the same array.
+
+    Beyond the mesh and overlay, peak memory is the (n, 4) float32 output,
+    16 bytes per drawn face, plus temporaries proportional to chunk_size;
+    overlay_colours holds several float64 (n_faces, 4) copies (32 bytes
+    per face each). With pvals or parcel, faces[order] is copied once
+    (24 bytes per drawn face).
+    Returns the colours and the vmin, vmax of the colour scale."""
+    F = mesh.faces
+    if order is None:
+        order = np.arange(len(F))
+    if parcel is not None:
+        if parcel.sum() == 0:
+            parcel = None
+    if neighbours is None and pvals is not None:
+        neighbours = mesh.neighbours
+    # colours smoothed (mean) or majority vote if label
+    method = "majority" if label else "mean"
+    # the colour scale and alpha range span all faces, as in overlay_colours
+    chunks = [slice(i, i + chunk_size) for i in range(0, len(F), chunk_size)]
+    if vmax is None:
+        vmin, vmax = np.inf, -np.inf
+        for chunk in chunks:
+            values = reduce_vertex_values(overlay, F[chunk], method)
+            vmin, vmax = min(vmin, values.min()), max(vmax, values.max())
+    if alpha_colour is not None:
+        alpha_min, alpha_max = np.inf, -np.inf
+        for chunk in chunks:
+            alpha = reduce_vertex_values(alpha_colour, F[chunk])
+            alpha_min = min(alpha_min, alpha.min())
+            alpha_max = max(alpha_max, alpha.max())
+    cmap = plt.get_cmap(cmap)
+    lut = cmap(np.arange(cmap.N)).astype(np.float32)
+    grey = np.array([0.86, 0.86, 0.86, 1], dtype=np.float32)
+    if mask_colour is None:
+        mask_colour = grey
+    # shading comes last, so it is only fused when nothing is drawn on top
+    shade_chunks = intensity is not None and pvals is None and parcel is None
+
+    C = np.empty((len(order), 4), dtype=np.float32)
+    for start in range(0, len(order), chunk_size):
+        chunk = order[start : start + chunk_size]
+        out = C[start : start + chunk_size]
+        x = reduce_vertex_values(overlay, F[chunk], method).astype(float)
+        x -= vmin
+        x *= cmap.N / (vmax - vmin)
+        bad = np.isnan(x)
+        x[bad] = 0
+        np.clip(x, 0, cmap.N - 1, out=x)
+        np.take(lut, x.astype(np.intp), axis=0, out=out)
+        out[bad] = cmap.get_bad()
+        if alpha_colour is not None:
+            alpha = reduce_vertex_values(alpha_colour, F[chunk])
+            alpha = 0.1 + 0.9 * (alpha - alpha_min) / (alpha_max - alpha_min)
+            out *= alpha[:, np.newaxis]
+            out += (1 - alpha[:, np.newaxis]) * grey
+            np.clip(out, 0, 1, out=out)
+        if mask is not None and pvals is None:
+            out[mask[F[chunk]].any(axis=1)] = mask_colour
+        if shade_chunks:
+            out[:, :3] *= intensity[start : start + chunk_size].reshape(-1, 1)
+
+    if pvals is not None or parcel is not None:
+        triangles = F[order]
+    if pvals is not None:
+        C = adjust_colours_pvals(
+            C,
+            pvals,
+            triangles,
+            mask,
+            mask_colour=mask_colour,
+            border_colour=border_colour,
+            neighbours=neighbours,
+            ring_width=ring_width,
+        )
+    if parcel is not None:
+        C = add_parcellation_colours(
+            C,
+            parcel,
+            triangles,
+            parcel_cmap,
+            mask,
+            mask_colour=mask_colour,
+            filled=filled_parcels,
+            border_triangles=F,
+        )
+    if intensity is not None and not shade_chunks:
+        C[:, :3] *= intensity.reshape(-1, 1)
+    return C, vmin, vmax
+
+
+def corner_colours(
+    mesh,
+    overlay,
+    colours,
+    order,
+    intensity,
+    cmap="viridis",
+    vmin=None,
+    vmax=None,
+    alpha_colour=None,
+):
+    """Shaded colours at the corners of the drawn faces for interpolation.
+
+    The overlay is coloured per vertex on the colour scale vmin, vmax of
+    the face colours. Faces whose shaded colours differ from the plain
+    colour map, i.e. that are masked, greyed out, outlined or parcellated,
+    keep their flat face colour at all corners.
+
+    Parameters:
+    -----------
+    colours : (n, 4) array
+        Final shaded colours of the faces in order.
+    order : (n,) array
+        Indices of the drawn faces into mesh.faces.
+    intensity : (n, 1) array
+        Shading of the drawn faces.
+
+    Returns:
+    --------
+    corners : (n, 3, 4) float32 array
+    """
+    plain, _, _ = overlay_colours(
+        mesh, overlay, cmap=cmap, vmin=vmin, vmax=vmax, alpha_colour=alpha_colour
+    )
+    plain = plain[order]
+    plain[:, :3] *= intensity
+    flat = np.abs(plain - colours).max(axis=1) > 1e-6
+
+    vertex_colours = plt.get_cmap(cmap)(np.clip((overlay - vmin) / (vmax - vmin), 0, 1))
+    if alpha_colour is not None:
+        vertex_colours = adjust_colours_alpha(vertex_colours, alpha_colour)
+    corners = vertex_colours.astype(np.float32)[mesh.faces[order]]
+    corners[:, :, :3] *= intensity[:, np.newaxis]
+    corners[flat] = colours[flat, np.newaxis]
+    return corners
+
+
+def project_faces(
     vertices,
     faces,
-    overlay,
+    MVP,
+    show_back=False,
+    return_depth=False,
+    low_memory=False,
+    chunk_size=2**16,
+):
+    """Project faces into the view of MVP, cull and depth sort them.
+
+    With low_memory, faces are culled and their depths taken chunk_size
+    faces at a time, and T and depth are returned as float32, 36 bytes per
+    drawn face, instead of float64 corner coordinates of all faces. The
+    culling and the order of the faces are the same.
+
+    Returns:
+    --------
+    T : (n, 3, 2) array
+        Screen coordinates of the drawn faces, sorted back to front.
+    order : (n,) array
+        Indices of the drawn faces into faces.
+    front : (n_faces,) boolean array
+        Front facing faces.
+    limits : tuple
+        (x_min, x_max, y_min, y_max) of all projected vertices.
+    depth : (n, 3) array
+        Only if return_depth. Normalized depth of the corners of the drawn
+        faces, smaller is nearer.
+    """
+    # translate coordinates based on viewing position
+    V = np.c_[vertices, np.ones(len(vertices))] @ MVP.T
+    V /= V[:, 3].reshape(-1, 1)
+    limits = (V[:, 0].min(), V[:, 0].max(), V[:, 1].min(), V[:, 1].max())
+    if low_memory:
+        return _project_faces_chunked(
+            V, faces, limits, show_back, return_depth, chunk_size
+        )
+
+    # triangle coordinates
+    T = V[:, :2][faces]
+    # get Z values for ordering triangle plotting
+    Z = -V[:, 2][faces].mean(axis=1)
+    # sort the triangles based on their z coordinate
+    front, back = frontback(T)
+    if show_back:
+        order = np.arange(len(faces))
+    else:
+        order = np.flatnonzero(front)
+    order = order[np.argsort(Z[order])]
+    if return_depth:
+        return T[order], order, front, limits, V[faces[order], 2]
+    return T[order], order, front, limits
+
+
+def _project_faces_chunked(V, faces, limits, show_back, return_depth, chunk_size):
+    """project_faces of projected vertices V with low_memory"""
+    front = np.empty(len(faces), dtype=bool)
+    for start in range(0, len(faces), chunk_size):
+        front[start : start + chunk_size] = frontback(
+            V[:, :2][faces[start : start + chunk_size]]
+        )[0]
+    if show_back:
+        order = np.arange(len(faces))
+    else:
+        order = np.flatnonzero(front)
+    Z = np.empty(len(order))
+    for start in range(0, len(order), chunk_size):
+        chunk = order[start : start + chunk_size]
+        Z[start : start + chunk_size] = -V[:, 2][faces[chunk]].mean(axis=1)
+    order = order[np.argsort(Z)]
+    del Z
+    T = np.empty((len(order), 3, 2), dtype=np.float32)
+    depth = np.empty((len(order), 3), dtype=np.float32)
+    for start in range(0, len(order), chunk_size):
+        corners = V[faces[order[start : start + chunk_size]]]
+        T[start : start + chunk_size] = corners[:, :, :2]
+        depth[start : start + chunk_size] = corners[:, :, 2]
+    if return_depth:
+        return T, order, front, limits, depth
+    return T, order, front, limits
+
+
+def draw_faces(ax, T, colours, limits, transparency=1, cmap=None, paths=None):
+    """Add projected faces to ax as a PolyCollection and frame the view.
+    paths of a previously drawn collection with the same T can be passed
+    to skip building them again."""
+    if paths is None:
+        collection = PolyCollection(
+            T, closed=True, linewidth=0, antialiased=False, facecolor=colours, cmap=cmap
+        )
+        # drop the closing segment; the paths share one codes array
+        paths = collection.get_paths()
+        if len(paths):
+            paths[0].codes[-1] = 0
+            if paths[-1].codes is not paths[0].codes:
+                for path in paths:
+                    path.codes[-1] = 0
+    else:
+        collection = PathCollection(
+            paths, linewidth=0, antialiased=False, facecolor=colours, cmap=cmap
+        )
+
+    collection.set_alpha(transparency)
+    # limits are set from the projected vertices below
+    ax.add_collection(collection, autolim=False)
+
+    # Set xlim and ylim based on vertex coordinates
+    ax.set_xlim(limits[:2])
+    ax.set_ylim(limits[2:])
+
+    ax.set_aspect("equal")
+    ax.axis("off")
+    return collection
+
+
+def raster_size(ax, limits, dpi=None):
+    """Pixel (width, height) of the data limits when drawn into ax with
+    equal aspect, at the figure dpi or the given dpi."""
+    # the box before any earlier equal aspect adjustment for other limits
+    bbox = ax.get_position(original=True).transformed(ax.figure.transFigure)
+    width, height = limits[1] - limits[0], limits[3] - limits[2]
+    scale = min(bbox.width / width, bbox.height / height)
+    if dpi is not None:
+        scale *= dpi / ax.figure.dpi
+    return max(int(np.ceil(width * scale)), 1), max(int(np.ceil(height * scale)), 1)
+
+
+def rasterize_faces(
+    T,
+    depth,
+    width,
+    height,
+    limits,
+    return_barycentric=False,
+    return_coverage=False,
+    chunk_size=2**22,
+    face_chunk_size=2**16,
+):
+    """Scan-convert projected triangles with a depth buffer.
+
+    Each triangle is cut into one span of covered pixel centres per pixel
+    row, and the spans are filled in vectorized chunks of at most chunk_size
+    pixels, so the cost grows with the covered pixels rather than with the
+    number of triangles. Triangles are set up in float64 face_chunk_size at
+    a time, so that T and depth can be float32 and the per-face
+    temporaries do not grow with the number of faces.
+
+    Parameters:
+    -----------
+    T : (n, 3, 2) array
+        Screen coordinates of the triangles.
+    depth : (n, 3) array
+        Depth of the triangle corners, smaller is nearer.
+    width, height : int
+        Size of the raster in pixels.
+    limits : tuple
+        (x_min, x_max, y_min, y_max) covered by the raster.
+    return_barycentric : bool
+        Also return the barycentric coordinates of each pixel centre in its face.
+    return_coverage : bool
+        Also return the number of pixel centres covered by each face,
+        hidden or not.
+
+    Returns:
+    --------
+    face_buffer : (height, width) int array
+        Index into T of the nearest face per pixel, -1 where empty.
+        Row 0 is the top of the image.
+    barycentric : (height, width, 3) float32 array
+        Only if return_barycentric.
+    coverage : (n,) int array
+        Only if return_coverage.
+    """
+    z_buffer = np.full(width * height, np.inf, dtype=np.float32)
+    face_buffer = np.full(width * height, -1, dtype=np.int32)
+    if return_barycentric:
+        barycentric = np.zeros((width * height, 3), dtype=np.float32)
+    if return_coverage:
+        coverage = np.zeros(len(T), dtype=np.int64)
+    for start in range(0, len(T), face_chunk_size):
+        stop = start + face_chunk_size
+        tri, y, x_lo, lengths, (a0, b0, c0, a1, b1, c1, zx, zy, zc) = _face_spans(
+            T[start:stop], depth[start:stop], width, height, limits
+        )
+        if return_coverage:
+            coverage[start:stop] = np.bincount(
+                tri, lengths, minlength=len(T[start:stop])
+            )
+        # fill the spans in chunks of about chunk_size pixels, faces drawn
+        # later win ties, also across face chunks
+        ends = np.cumsum(lengths)
+        bounds = np.searchsorted(
+            ends, np.arange(chunk_size, ends[-1:].sum(), chunk_size)
+        )
+        for chunk in np.split(np.arange(len(lengths)), bounds):
+            if len(chunk) == 0:
+                continue
+            n = lengths[chunk]
+            face = np.repeat(tri[chunk], n)
+            row = np.repeat(y[chunk], n)
+            col = (
+                np.repeat(x_lo[chunk], n)
+                + np.arange(n.sum())
+                - np.repeat(np.cumsum(n) - n, n)
+            )
+            pixel = row * width + col
+            z = (zc[face] + zx[face] * col + zy[face] * row).astype(np.float32)
+            np.minimum.at(z_buffer, pixel, z)
+            nearest = z <= z_buffer[pixel]
+            face, pixel = face[nearest], pixel[nearest]
+            face_buffer[pixel] = start + face
+            if return_barycentric:
+                col, row = col[nearest], row[nearest]
+                l0 = a0[face] * col + b0[face] * row + c0[face]
+                l1 = a1[face] * col + b1[face] * row + c1[face]
+                barycentric[pixel] = np.c_[l0, l1, 1 - l0 - l1]
+    face_buffer = face_buffer.reshape(height, width)
+    if not (return_barycentric or return_coverage):
+        return face_buffer
+    result = (face_buffer,)
+    if return_barycentric:
+        result += (barycentric.reshape(height, width, 3),)
+    if return_coverage:
+        result += (coverage,)
+    return result
+
+
+def _face_spans(T, depth, width, height, limits):
+    """Pixel row spans covered by triangles and the coefficients of their
+    barycentric coordinates and depth in the pixel position, see
+    rasterize_faces. Returns the triangle, row, first column and length of
+    every span and the coefficients a0, b0, c0, a1, b1, c1, zx, zy, zc."""
+    T = np.asarray(T, dtype=np.float64)
+    depth = np.asarray(depth, dtype=np.float64)
+    x_min, x_max, y_min, y_max = limits
+    # pixel coordinates, pixel centres at integer positions
+    px = (T[:, :, 0] - x_min) * (width / (x_max - x_min)) - 0.5
+    py = (y_max - T[:, :, 1]) * (height / (y_max - y_min)) - 0.5
+    # barycentric coordinates are affine in the pixel position:
+    # l0 = a0 * x + b0 * y + c0, l1 = a1 * x + b1 * y + c1, l2 = 1 - l0 - l1
+    area = (py[:, 1] - py[:, 2]) * (px[:, 0] - px[:, 2]) + (px[:, 2] - px[:, 1]) * (
+        py[:, 0] - py[:, 2]
+    )
+    valid = area != 0
+    area[~valid] = 1
+    a0, b0 = (py[:, 1] - py[:, 2]) / area, (px[:, 2] - px[:, 1]) / area
+    a1, b1 = (py[:, 2] - py[:, 0]) / area, (px[:, 0] - px[:, 2]) / area
+    c0 = -a0 * px[:, 2] - b0 * py[:, 2]
+    c1 = -a1 * px[:, 2] - b1 * py[:, 2]
+    # depth is affine in the pixel position as well
+    zx = a0 * (depth[:, 0] - depth[:, 2]) + a1 * (depth[:, 1] - depth[:, 2])
+    zy = b0 * (depth[:, 0] - depth[:, 2]) + b1 * (depth[:, 1] - depth[:, 2])
+    zc = (
+        depth[:, 2]
+        + c0 * (depth[:, 0] - depth[:, 2])
+        + c1 * (depth[:, 1] - depth[:, 2])
+    )
+
+    # one span per triangle and pixel row
+    y0 = np.clip(np.ceil(py.min(axis=1)), 0, height).astype(np.int64)
+    y1 = np.clip(np.floor(py.max(axis=1)), -1, height - 1).astype(np.int64)
+    rows = np.where(valid, np.maximum(y1 - y0 + 1, 0), 0)
+    tri = np.repeat(np.arange(len(T)), rows)
+    y = y0[tri] + np.arange(rows.sum()) - np.repeat(np.cumsum(rows) - rows, rows)
+    # each l >= 0 bounds x from one side, for a == 0 the whole row is in or out
+    x_lo = np.clip(np.ceil(px.min(axis=1)), 0, width)[tri]
+    x_hi = np.clip(np.floor(px.max(axis=1)), -1, width - 1)[tri]
+    eps = 1e-6
+    for a, b in (
+        (a0[tri], b0[tri] * y + c0[tri]),
+        (a1[tri], b1[tri] * y + c1[tri]),
+        (-a0[tri] - a1[tri], 1 - (b0[tri] + b1[tri]) * y - c0[tri] - c1[tri]),
+    ):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bound = -b / a
+        x_lo = np.where(a > 0, np.maximum(x_lo, np.ceil(bound - eps)), x_lo)
+        x_hi = np.where(a < 0, np.minimum(x_hi, np.floor(bound + eps)), x_hi)
+        x_hi = np.where((a == 0) & (b < -eps), -1, x_hi)
+    lengths = np.maximum(x_hi - x_lo + 1, 0).astype(np.int64)
+    spans = np.flatnonzero(lengths)
+    return (
+        tri[spans],
+        y[spans],
+        x_lo[spans].astype(np.int64),
+        lengths[spans],
+        (a0, b0, c0, a1, b1, c1, zx, zy, zc),
+    )
+
+
+def visible_faces(T, depth, width, height, limits):
+    """Faces that are visible in a width x height depth buffer.
+
+    A face is visible when it is the nearest face at one of the pixel
+    centres. Faces that are nearest nowhere are only dropped when the face
+    at the pixel of their centroid is drawn after them (is later in T, which
+    is sorted back to front), so faces too small to cover a pixel centre
+    and faces where the depth sort disagrees with the buffer are kept.
+
+    Returns:
+    --------
+    visible : (n,) boolean array
+    """
+    face_buffer = rasterize_faces(T, depth, width, height, limits)
+    visible = np.zeros(len(T), dtype=bool)
+    visible[face_buffer[face_buffer >= 0]] = True
+    hidden = np.flatnonzero(~visible)
+    x_min, x_max, y_min, y_max = limits
+    centroids = T[hidden].mean(axis=1)
+    px = (centroids[:, 0] - x_min) * (width / (x_max - x_min)) - 0.5
+    py = (y_max - centroids[:, 1]) * (height / (y_max - y_min)) - 0.5
+    px = np.clip(np.round(px), 0, width - 1).astype(np.int64)
+    py = np.clip(np.round(py), 0, height - 1).astype(np.int64)
+    visible[hidden] = face_buffer[py, px] < hidden
+    return visible
+
+
+def fully_visible_faces(T, depth, width, height, limits):
+    """Faces that are the nearest face at every pixel centre they cover in
+    a width x height depth buffer, and cover at least one.
+
+    Returns:
+    --------
+    visible : (n,) boolean array
+    """
+    face_buffer, coverage = rasterize_faces(
+        T, depth, width, height, limits, return_coverage=True
+    )
+    shown = np.bincount(face_buffer[face_buffer >= 0], minlength=len(T))
+    return (coverage > 0) & (shown == coverage)
+
+
+def merged_paths(T, triangles, colours, mergeable):
+    """Merge adjacent faces of identical colour into polygons.
+
+    Faces in mergeable that share an edge and have the same colour at 8 bit
+    precision are joined, each group becomes one compound path made of the
+    boundary loops of its faces, holes included. Merged faces must be front
+    facing, so that all of them wind the same way, and fully visible, so
+    that drawing the group at the position of its last face in T keeps the
+    depth order correct (see fully_visible_faces). Other faces are kept as
+    triangles at their own position.
+
+    Parameters:
+    -----------
+    T : (n, 3, 2) array
+        Projected faces sorted back to front.
+    triangles : (n, 3) array
+        Vertex indices of the faces in T.
+    colours : (n, 4) array
+        Face colours.
+    mergeable : (n,) boolean array
+        Faces that may be merged.
+
+    Returns:
+    --------
+    paths : list of Path
+        Paths to draw, back to front.
+    colours : (n_paths, 4) array
+    """
+    n = len(T)
+    # undirected edges, joined when both faces are mergeable with one colour
+    edges = triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    edge_face = np.repeat(np.arange(n), 3)
+    _, edge_id, counts = np.unique(
+        np.sort(edges, axis=1), axis=0, return_inverse=True, return_counts=True
+    )
+    edge_id = edge_id.ravel()
+    key = np.ascontiguousarray(np.round(np.asarray(colours) * 255).astype(np.uint8))
+    key = key.view(np.uint32).ravel()
+    pair = np.argsort(edge_id, kind="stable")
+    pair = pair[counts[edge_id[pair]] == 2].reshape(-1, 2)
+    a, b = edge_face[pair[:, 0]], edge_face[pair[:, 1]]
+    joined = mergeable[a] & mergeable[b] & (key[a] == key[b])
+    interior = np.zeros(len(edges), dtype=bool)
+    interior[pair[joined].ravel()] = True
+    graph = csr_matrix((np.ones(joined.sum()), (a[joined], b[joined])), shape=(n, n))
+    _, group = connected_components(graph, directed=False)
+    merged = np.bincount(group, minlength=n) > 1
+
+    # boundary loops: each vertex has as many boundary edges leaving as
+    # entering its group, so pair them up in sorted order
+    boundary = np.flatnonzero(~interior & merged[group[edge_face]])
+    edge_group = group[edge_face[boundary]]
+    start, end = edges[boundary].T
+    leaving = np.lexsort((start, edge_group))
+    entering = np.lexsort((end, edge_group))
+    consistent = (start[leaving] == end[entering]) & (
+        edge_group[leaving] == edge_group[entering]
+    )
+    # groups whose boundary does not close (non-manifold) stay triangles
+    broken = set(np.unique(edge_group[leaving[~consistent]]))
+    follow = np.empty(len(boundary), dtype=np.int64)
+    follow[entering] = leaving
+
+    vertex_xy = np.zeros((triangles.max() + 1, 2))
+    vertex_xy[triangles] = T
+    loops = {}
+    visited = np.zeros(len(boundary), dtype=bool)
+    for edge in leaving:
+        if visited[edge] or edge_group[edge] in broken:
+            continue
+        loop = []
+        while not visited[edge]:
+            visited[edge] = True
+            loop.append(start[edge])
+            edge = follow[edge]
+        loops.setdefault(edge_group[edge], []).append(loop)
+
+    # draw each group at the position of its last face
+    last = np.full(n, -1)
+    np.maximum.at(last, group, np.arange(n))
+    paths = []
+    drawn = []
+    triangle_codes = [Path.MOVETO, Path.LINETO, Path.LINETO, Path.CLOSEPOLY]
+    for i in range(n):
+        if group[i] in loops:
+            if last[group[i]] != i:
+                continue
+            vertices, codes = [], []
+            for loop in loops[group[i]]:
+                vertices.append(vertex_xy[loop + loop[:1]])
+                codes += [Path.MOVETO] + [Path.LINETO] * (len(loop) - 1)
+                codes.append(Path.CLOSEPOLY)
+            paths.append(Path(np.concatenate(vertices), codes))
+        else:
+            paths.append(Path(np.r_[T[i], T[i, :1]], triangle_codes))
+        drawn.append(i)
+    return paths, np.asarray(colours)[drawn]
+
+
+def render_image(face_buffer, colours, supersample=1, barycentric=None):
+    """RGBA image of per-face colours from a face buffer, averaging
+    supersample x supersample pixel blocks for antialiasing.
+    With (n, 3, 4) colours at the face corners and the barycentric
+    coordinates of rasterize_faces, colours are interpolated across faces."""
+    covered = face_buffer >= 0
+    image = np.zeros(face_buffer.shape + (4,), dtype=np.float32)
+    if barycentric is None:
+        image[covered] = colours[face_buffer[covered]]
+    else:
+        image[covered] = np.einsum(
+            "pk,pkc->pc", barycentric[covered], colours[face_buffer[covered]]
+        )
+    if supersample > 1:
+        height, width = face_buffer.shape
+        # average with premultiplied alpha so empty pixels do not darken edges
+        image[..., :3] *= image[..., 3:]
+        image = image.reshape(
+            height // supersample, supersample, width // supersample, supersample, 4
+        ).mean(axis=(1, 3))
+        alpha = image[..., 3:]
+        np.divide(image[..., :3], alpha, out=image[..., :3], where=alpha > 0)
+    return image
+
+
+def draw_image(ax, image, limits, transparency=1):
+    """Show a rendered image in ax over the data limits and frame the view"""
+    im = ax.imshow(
+        image,
+        extent=limits,
+        alpha=transparency,
+        interpolation="nearest",
+        origin="upper",
+    )
+    ax.set_xlim(limits[:2])
+    ax.set_ylim(limits[2:])
+
+    ax.set_aspect("equal")
+    ax.axis("off")
+    return im
+
+
+def draw_arrows(
     ax,
+    mesh,
+    MVP,
+    front,
+    arrows,
+    arrow_subset,
+    arrow_size=0.5,
+    arrow_colours=None,
+    arrow_head=0.05,
+    arrow_width=0.001,
+):
+    """Draw arrows at the visible vertices of arrow_subset as one quiver.
+
+    arrows either holds one vector per vertex or one per entry of
+    arrow_subset. An arrow is visible when its vertex belongs to a front
+    facing face and lies in front of the mesh centre."""
+    geometry = arrow_geometry(
+        mesh,
+        MVP,
+        front,
+        arrows,
+        arrow_subset,
+        arrow_size=arrow_size,
+        arrow_colours=arrow_colours,
+        arrow_head=arrow_head,
+        arrow_width=arrow_width,
+    )
+    if geometry is None:
+        return None
+    return draw_quiver(ax, **geometry)
+
+
+def arrow_geometry(
+    mesh,
+    MVP,
+    front,
+    arrows,
+    arrow_subset,
+    arrow_size=0.5,
+    arrow_colours=None,
+    arrow_head=0.05,
+    arrow_width=0.001,
+):
+    """Screen space arrows of draw_arrows, as a dict of draw_quiver
+    arguments, or None if no arrow is visible."""
+    vertices = mesh.vertices
+    arrow_subset = np.asarray(arrow_subset)
+    center = np.array([0, 0, 0, 1]) @ MVP.T
+    center /= center[3]
+    # calculate arrow position + small shift in surface normal direction
+    A_base = (
+        np.c_[vertices + mesh.vertex_normals * 0.01, np.ones(len(vertices))] @ MVP.T
+    )
+    A_base /= A_base[:, 3].reshape(-1, 1)
+
+    # calculate arrow direction
+    A_dir = np.copy(arrows)
+    # normalise arrow size
+    max_arrow = np.max(np.linalg.norm(arrows, axis=1))
+    A_dir = arrow_size * A_dir / max_arrow
+    A_dir = np.c_[A_dir, np.ones(len(A_dir))] @ MVP.T
+    A_dir /= A_dir[:, 3].reshape(-1, 1)
+    # if length of arrows corresponds perfectly with coordinates
+    # assume 1:1 matching, otherwise a custom list matching arrow_subset
+    if len(A_dir) == len(A_base):
+        A_dir = A_dir[arrow_subset]
+    elif len(A_dir) != len(arrow_subset):
+        raise ValueError("arrows must match the number of vertices or arrow_subset.")
+
+    # lookup table of vertices on front facing faces
+    front_vertices = np.zeros(len(vertices), dtype=bool)
+    front_vertices[mesh.faces[front].ravel()] = True
+    visible = front_vertices[arrow_subset] & (
+        A_base[arrow_subset, 2] < center[2] + 0.01
+    )
+    if not visible.any():
+        return None
+    base = A_base[arrow_subset[visible], :2]
+    direction = A_dir[visible, :2]
+    if arrow_colours is None:
+        colours = to_rgba_array("k")
+    else:
+        colours = to_rgba_array(arrow_colours)[visible]
+
+    # ax.arrow draws the head beyond the given length, quiver includes it
+    head_length = 1.5 * arrow_head
+    length = np.linalg.norm(direction, axis=1, keepdims=True)
+    vector = direction * np.divide(
+        length + head_length, length, out=np.ones_like(length), where=length > 0
+    )
+    tail = base - direction * 0.5
+    return dict(
+        tail=tail,
+        vector=vector,
+        colours=colours,
+        arrow_head=arrow_head,
+        arrow_width=arrow_width,
+    )
+
+
+def draw_quiver(ax, tail, vector, colours, arrow_head=0.05, arrow_width=0.001):
+    """Draw screen space arrows from arrow_geometry as one quiver"""
+    head_length = 1.5 * arrow_head
+    return ax.quiver(
+        tail[:, 0],
+        tail[:, 1],
+        vector[:, 0],
+        vector[:, 1],
+        color=colours,
+        # ax.arrow patches are outlined in their colour as well
+        edgecolor=colours,
+        linewidth=plt.rcParams["patch.linewidth"],
+        units="xy",
+        angles="xy",
+        scale_units="xy",
+        scale=1,
+        width=arrow_width,
+        headwidth=arrow_head / arrow_width,
+        headlength=head_length / arrow_width,
+        headaxislength=head_length / arrow_width,
+        pivot="tail",
+    )
+
+
+class SurfaceScene:
+    """Projected, depth sorted and coloured faces of a plot_surf render.
+
+    A scene holds all that is needed to draw the render again without the
+    mesh or overlays, into other axes, at another dpi or into another file
+    type: the screen coordinates and depth of the drawn faces, the shaded
+    face colours of every overlay layer and the arrows. Drawing a scene only
+    builds the matplotlib artists. Scenes are stored as .npz files, see save
+    and load. pick and connect read out the vertex and values under a screen
+    point.
+
+    Parameters:
+    -----------
+    T : (n, 3, 2) array
+        Screen coordinates of the drawn faces, sorted back to front.
+    depth : (n, 3) array
+        Depth of the face corners, smaller is nearer.
+    layers : list of (n, 4) arrays
+        Shaded face colours of each overlay, drawn in order.
+    limits : tuple
+        (x_min, x_max, y_min, y_max) of the view.
+    triangles : (n, 3) array, optional
+        Vertex indices of the drawn faces.
+    transparency : float
+        Alpha of every layer.
+    arrows : dict, optional
+        Arguments of draw_quiver, see arrow_geometry.
+    values : dict, optional
+        Per-vertex arrays reported by pick, e.g. the overlay and parcel.
+    corner_layers : list of (n, 3, 4) arrays, optional
+        Colours at the face corners of each layer, interpolated across the
+        faces by backend="raster", see corner_colours.
+    """
+
+    def __init__(
+        self,
+        T,
+        depth,
+        layers,
+        limits,
+        triangles=None,
+        transparency=1,
+        arrows=None,
+        values=None,
+        corner_layers=None,
+    ):
+        self.T = T
+        self.depth = depth
+        self.layers = list(layers)
+        self.limits = tuple(limits)
+        self.triangles = triangles
+        self.transparency = transparency
+        self.arrows = arrows
+        self.values = {} if values is None else dict(values)
+        self.corner_layers = corner_layers
+        # spatial index for pick, built on the first query
+        self._index = None
+
+    def __len__(self):
+        return len(self.T)
+
+    def draw(
+        self,
+        ax=None,
+        backend="vector",
+        raster_dpi=None,
+        supersample=2,
+        merge_faces=False,
+        cmap=None,
+    ):
+        """Draw the scene into ax, a new figure by default. backend,
+        raster_dpi, supersample and merge_faces are those of plot_surf.
+        Returns ax."""
+        if backend not in ("vector", "raster"):
+            raise ValueError(f"Unknown backend '{backend}', use 'vector' or 'raster'.")
+        if ax is None:
+            fig, ax = plt.subplots(1, 1, figsize=(4, 4))
+        T, limits = self.T, self.limits
+        if backend == "raster" or merge_faces:
+            width, height = raster_size(ax, limits, raster_dpi)
+            width, height = width * supersample, height * supersample
+        barycentric = None
+        if backend == "raster" and self.corner_layers is not None:
+            face_buffer, barycentric = rasterize_faces(
+                T, self.depth, width, height, limits, return_barycentric=True
+            )
+        elif backend == "raster":
+            face_buffer = rasterize_faces(T, self.depth, width, height, limits)
+        elif merge_faces:
+            front, back = frontback(T)
+            mergeable = front & fully_visible_faces(
+                T, self.depth, width, height, limits
+            )
+            triangles = self.triangles
+            if triangles is None:
+                # without vertex indices only faces sharing coordinates merge
+                _, triangles = np.unique(T.reshape(-1, 2), axis=0, return_inverse=True)
+                triangles = triangles.reshape(-1, 3)
+
+        paths = None
+        for i, C in enumerate(self.layers):
+            if backend == "raster":
+                if barycentric is not None:
+                    C = self.corner_layers[i]
+                image = render_image(face_buffer, C, supersample, barycentric)
+                draw_image(ax, image, limits, transparency=self.transparency)
+            elif merge_faces:
+                merged, C = merged_paths(T, triangles, C, mergeable)
+                draw_faces(
+                    ax,
+                    T,
+                    C,
+                    limits,
+                    transparency=self.transparency,
+                    cmap=cmap,
+                    paths=merged,
+                )
+            else:
+                collection = draw_faces(
+                    ax,
+                    T,
+                    C,
+                    limits,
+                    transparency=self.transparency,
+                    cmap=cmap,
+                    paths=paths,
+                )
+                paths = collection.get_paths()
+
+        if self.arrows is not None:
+            draw_quiver(ax, **self.arrows)
+            plt.subplots_adjust(left=0, right=1, top=1, bottom=0, wspace=0, hspace=0)
+        return ax
+
+    def _build_index(self):
+        """Uniform grid over the limits with about two faces per cell,
+        listing for every cell the faces whose bounding box overlaps it
+        in drawing order."""
+        x_min, x_max, y_min, y_max = self.limits
+        n_cells = max(int(np.sqrt(len(self) / 2)), 1)
+        origin = np.array([x_min, y_min])
+        scale = n_cells / np.array([x_max - x_min, y_max - y_min])
+        lo = np.floor((self.T.min(axis=1) - origin) * scale).astype(np.int64)
+        hi = np.floor((self.T.max(axis=1) - origin) * scale).astype(np.int64)
+        lo, hi = lo.clip(0, n_cells - 1), hi.clip(0, n_cells - 1)
+        nx, ny = (hi - lo + 1).T
+        counts = nx * ny
+        face = np.repeat(np.arange(len(self)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell = (lo[face, 1] + k // nx[face]) * n_cells + lo[face, 0] + k % nx[face]
+        order = np.argsort(cell, kind="stable")
+        indptr = np.zeros(n_cells**2 + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell, minlength=n_cells**2), out=indptr[1:])
+        self._index = (n_cells, origin, scale, indptr, face[order])
+
+    def pick(self, x, y):
+        """Frontmost face at the point (x, y), in data coordinates of the
+        axes the scene is drawn into.
+
+        Candidates come from a uniform grid index over the faces, built on
+        the first call, so a query only tests the few faces of one cell.
+
+        Returns:
+        --------
+        None if no face is at the point, otherwise a dict with the face
+        (index into the scene), its barycentric coordinates at the point
+        and, when triangles are known, the vertex of the face nearest to the
+        point and the value of each array in values at that vertex.
+        """
+        if self._index is None:
+            self._build_index()
+        n_cells, origin, scale, indptr, faces = self._index
+        cx, cy = np.floor((np.array([x, y]) - origin) * scale).astype(np.int64)
+        if not (0 <= cx < n_cells and 0 <= cy < n_cells):
+            return None
+        cell = cy * n_cells + cx
+        candidates = faces[indptr[cell] : indptr[cell + 1]]
+        a, b, c = self.T[candidates].transpose(1, 2, 0)
+        # barycentric coordinates of the point in every candidate
+        area = (b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            l1 = ((x - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (y - a[1])) / area
+            l2 = ((b[0] - a[0]) * (y - a[1]) - (x - a[0]) * (b[1] - a[1])) / area
+        l0 = 1 - l1 - l2
+        inside = np.flatnonzero((l0 >= 0) & (l1 >= 0) & (l2 >= 0))
+        if len(inside) == 0:
+            return None
+        # candidates are in drawing order, the last one is in front
+        i = inside[-1]
+        barycentric = np.array([l0[i], l1[i], l2[i]])
+        result = {"face": int(candidates[i]), "barycentric": barycentric}
+        if self.triangles is not None:
+            vertex = int(self.triangles[candidates[i], np.argmax(barycentric)])
+            result["vertex"] = vertex
+            for name, values in self.values.items():
+                result[name] = values[vertex]
+        return result
+
+    def connect(self, ax, callback=None):
+        """Report what is under the mouse in ax, which shows this scene.
+
+        callback(result) is called on every mouse move over ax with the
+        result of pick. By default the vertex and its values are written in
+        the top left corner of ax. Returns the matplotlib connection id."""
+        if callback is None:
+            text = ax.text(0.01, 0.99, "", transform=ax.transAxes, va="top", fontsize=8)
+
+            def callback(result):
+                if result is None:
+                    text.set_text("")
+                else:
+                    text.set_text(
+                        "\n".join(
+                            (
+                                f"{key}: {value:.4g}"
+                                if isinstance(value, (float, np.floating))
+                                else f"{key}: {value}"
+                            )
+                            for key, value in result.items()
+                            if key != "barycentric"
+                        )
+                    )
+                ax.figure.canvas.draw_idle()
+
+        def motion(event):
+            if event.inaxes is ax:
+                callback(self.pick(event.xdata, event.ydata))
+
+        return ax.figure.canvas.mpl_connect("motion_notify_event", motion)
+
+    def save(self, filename, compressed=False):
+        """Write the scene to an .npz file. Coordinates and colours are
+        stored as float32 and vertex indices as int32, 52 bytes per face
+        and layer; with compressed the file is smaller but slower to load."""
+        layers = [np.asarray(C, dtype=np.float32) for C in self.layers]
+        arrays = dict(
+            T=np.asarray(self.T, dtype=np.float32),
+            depth=np.asarray(self.depth, dtype=np.float32),
+            layers=np.stack(layers) if layers else np.zeros((0, len(self), 4)),
+            limits=np.asarray(self.limits),
+            transparency=np.asarray(self.transparency),
+        )
+        if self.triangles is not None:
+            arrays["triangles"] = np.asarray(self.triangles, dtype=np.int32)
+        if self.arrows is not None:
+            for key, value in self.arrows.items():
+                arrays[f"arrows_{key}"] = np.asarray(value)
+        for key, value in self.values.items():
+            arrays[f"values_{key}"] = np.asarray(value)
+        if self.corner_layers is not None:
+            arrays["corner_layers"] = np.stack(
+                [np.asarray(C, dtype=np.float32) for C in self.corner_layers]
+            )
+        (np.savez_compressed if compressed else np.savez)(filename, **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        """Scene written by save"""
+        with np.load(filename) as data:
+            arrows = {
+                key[len("arrows_") :]: data[key]
+                for key in data.files
+                if key.startswith("arrows_")
+            }
+            for key in ("arrow_head", "arrow_width"):
+                if key in arrows:
+                    arrows[key] = float(arrows[key])
+            values = {
+                key[len("values_") :]: data[key]
+                for key in data.files
+                if key.startswith("values_")
+            }
+            return cls(
+                data["T"],
+                data["depth"],
+                list(data["layers"]),
+                data["limits"],
+                triangles=data["triangles"] if "triangles" in data.files else None,
+                transparency=float(data["transparency"]),
+                arrows=arrows or None,
+                values=values,
+                corner_layers=(
+                    list(data["corner_layers"])
+                    if "corner_layers" in data.files
+                    else None
+                ),
+            )
+
+
+def plot_surf(
+    vertices,
+    faces=None,
+    overlay=None,
+    ax=None,
     view="lateral",
     cmap="viridis",
     label=False,
@@ -304,177 +1967,739 @@ def plot_surf(
     parcel=None,
     parcel_cmap=None,
     filled_parcels=False,
+    ring_width=2,
+    backend="vector",
+    raster_dpi=None,
+    supersample=2,
+    lod=False,
+    low_memory=False,
+    cull_hidden=False,
+    merge_faces=False,
+    shading_levels=None,
+    interpolate=False,
 ):
-    if view == "lateral":
-        view = 90
-    elif view == "medial":
-        view = 270
+    """Plot overlay(s) on a triangulated surface into ax, a new figure by
+    default.
 
-    vertices = vertices.astype(np.float32)
-    F = faces.astype(int)
-    vertices = (vertices - (vertices.max(0) + vertices.min(0)) / 2) / max(
-        vertices.max(0) - vertices.min(0)
-    )
+    vertices can also be a SurfaceMesh, with faces left as None, as in
+    plot_surf(mesh, overlay=overlay, ax=ax), in which case cached geometry
+    is reused between calls.
+    view is an angle or one of the names in VIEWS.
+
+    backend="vector" draws every visible triangle as a polygon.
+    backend="raster" scan-converts the triangles with a depth buffer into
+    one image shown with imshow, at raster_dpi (the figure dpi by default)
+    and supersample x supersample samples per pixel for antialiasing. Its
+    cost grows with the number of output pixels instead of triangles.
+
+    lod=True renders a decimated mesh with about one face per pixel of ax,
+    an int sets the number of faces instead. Decimated meshes are cached on
+    the SurfaceMesh, so pass one to reuse them. lod is ignored with arrows,
+    and None or 0 turn it off like False.
+
+    low_memory=True colours only the drawn faces, in float32 and in chunks
+    (see fused_overlay_colours), and projects and culls the faces in chunks
+    into float32 screen coordinates (see project_faces). Rasterisation
+    always works through the faces in chunks. Beyond the mesh, its cached
+    geometry and the pixel buffers, plot_surf then needs about 70 bytes per
+    drawn face instead of about 120, see docs/low_memory_peak.py. Combine
+    it with backend="raster", polygons cost far more memory than colours.
+
+    cull_hidden=True drops front facing triangles that are completely hidden
+    behind nearer ones before drawing with backend="vector", see
+    visible_faces. Visibility is tested in a depth buffer at the raster
+    resolution, so vector exports get smaller without a visible change at
+    that resolution. Ignored with transparency, where hidden faces show.
+
+    merge_faces=True joins adjacent, fully visible faces of identical colour
+    into single polygons for backend="vector", see merged_paths. Exports of
+    labels, parcels, masks and thresholded maps then hold far fewer paths.
+    As shading gives every face its own colour, shading_levels quantizes it
+    into that many steps so that shaded patches can merge too.
+
+    interpolate=True interpolates the overlay colours across faces with
+    backend="raster" instead of colouring each face by its mean value, see
+    corner_colours. Ignored for labels.
+
+    Returns the SurfaceScene that was drawn, which can be saved and drawn
+    again elsewhere without the mesh or overlays, and reads out the vertex
+    and values under the mouse, see SurfaceScene.pick and connect.
+    """
+    if backend not in ("vector", "raster"):
+        raise ValueError(f"Unknown backend '{backend}', use 'vector' or 'raster'.")
+    if isinstance(vertices, SurfaceMesh):
+        if faces is not None:
+            raise TypeError(
+                "faces must be None when vertices is a SurfaceMesh, which "
+                "already holds its faces."
+            )
+        mesh = vertices
+    elif faces is None:
+        raise TypeError("faces are required with vertex coordinates.")
+    else:
+        mesh = SurfaceMesh(vertices, faces)
+    if ax is None:
+        fig, ax = plt.subplots(1, 1, figsize=(4, 4))
+
+    view, x_rotate = resolve_view(view, x_rotate)
 
     if not isinstance(overlay, list):
         overlays = [overlay]
     else:
         overlays = overlay
 
-    if parcel is not None:
-        if parcel.sum() == 0:
-            parcel = None
+    if lod and arrows is None:
+        if lod is True:
+            bbox = ax.get_window_extent()
+            lod = bbox.width * bbox.height
+        lod_mesh = mesh.decimate(lod)
+        if lod_mesh is not mesh:
+            mesh = lod_mesh
+            overlays = [mesh.downsample(overlay, label) for overlay in overlays]
+            pvals = mesh.downsample(pvals, label=True)
+            mask = mesh.downsample(mask, label=True)
+            parcel = mesh.downsample(parcel, label=True)
+            alpha_colour = mesh.downsample(alpha_colour)
+            neighbours = None
+
+    vertices = mesh.vertices
+    F = mesh.faces
+
     if flat_map:
         z_rotate = 90
-        rotate = [90]
-        intensity = np.ones(len(F))
-    else:
-        # change light source if z is rotate
-        light = np.array([0, 0, 1, 1]) @ yrotate(z_rotate)
-        intensity = shading_intensity(vertices, F, light=light[:3], shading=0.7)
+    intensity = light_intensity(mesh, z_rotate, flat_map)
+    if merge_faces and shading_levels:
+        low, high = intensity.min(), intensity.max()
+        if high > low:
+            step = (high - low) / (shading_levels - 1)
+            intensity = low + np.round((intensity - low) / step) * step
 
-    for k, overlay in enumerate(overlays):
-        # colours smoothed (mean) or median if label
-        if label:
-            colours = np.median(overlay[F], axis=1)
-        else:
-            colours = np.mean(overlay[F], axis=1)
-        if vmax is not None:
-            colours = (colours - vmin) / (vmax - vmin)
-            colours = np.clip(colours, 0, 1)
+    # the view is the same for every overlay, so project, cull and sort once
+    MVP = mvp_matrix(view, x_rotate, z_rotate, flat_map)
+    T, order, front, limits, depth = project_faces(
+        vertices, F, MVP, show_back, return_depth=True, low_memory=low_memory
+    )
+    if cull_hidden and backend == "vector" and transparency == 1:
+        width, height = raster_size(ax, limits, raster_dpi)
+        visible = visible_faces(
+            T, depth, width * supersample, height * supersample, limits
+        )
+        T, order, depth = T[visible], order[visible], depth[visible]
+    intensity = intensity[order, np.newaxis]
+
+    colour_kwargs = dict(
+        cmap=cmap,
+        label=label,
+        pvals=pvals,
+        mask=mask,
+        mask_colour=mask_colour,
+        border_colour=border_colour,
+        alpha_colour=alpha_colour,
+        neighbours=neighbours,
+        parcel=parcel,
+        parcel_cmap=parcel_cmap,
+        filled_parcels=filled_parcels,
+        ring_width=ring_width,
+    )
+    interpolate = interpolate and backend == "raster" and not label
+    layers = []
+    corner_layers = []
+    for overlay in overlays:
+        if low_memory:
+            C, vmin, vmax = fused_overlay_colours(
+                mesh, overlay, order, intensity, vmax=vmax, vmin=vmin, **colour_kwargs
+            )
         else:
-            vmax = colours.max()
-            vmin = colours.min()
-            colours = (colours - colours.min()) / (colours.max() - colours.min())
-        C = plt.get_cmap(cmap)(colours)
-        if alpha_colour is not None:
-            C = adjust_colours_alpha(C, np.mean(alpha_colour[F], axis=1))
-        if pvals is not None:
-            C = adjust_colours_pvals(
-                C, pvals, F, mask, mask_colour=mask_colour, border_colour=border_colour
+            C, vmin, vmax = overlay_colours(
+                mesh, overlay, vmax=vmax, vmin=vmin, **colour_kwargs
             )
-        elif mask is not None:
-            C = mask_colours(C, F, mask, mask_colour=mask_colour)
-        if parcel is not None:
-            C = add_parcellation_colours(
-                C,
-                parcel,
-                F,
-                parcel_cmap,
-                mask,
-                mask_colour=mask_colour,
-                filled=filled_parcels,
-                neighbours=neighbours,
+            C = C[order]
+            # adjust intensity based on light source here
+            C[:, :3] *= intensity
+        layers.append(C)
+        if interpolate:
+            corner_layers.append(
+                corner_colours(
+                    mesh,
+                    overlay,
+                    C,
+                    order,
+                    intensity,
+                    cmap=cmap,
+                    vmin=vmin,
+                    vmax=vmax,
+                    alpha_colour=alpha_colour,
+                )
             )
 
-        # adjust intensity based on light source here
-        C[:, 0] *= intensity
-        C[:, 1] *= intensity
-        C[:, 2] *= intensity
-
-        # collection = PolyCollection(
-        #     [], closed=True, linewidth=0, antialiased=False, facecolor=C, cmap=cmap
-        # )
-
-        MVP = (
-            perspective(25, 1, 1, 100)
-            @ translate(0, 0, -3)
-            @ yrotate(view)
-            @ zrotate(z_rotate)
-            @ xrotate(x_rotate)
-            @ zrotate(270 * flat_map)
+    # per-vertex values read out by SurfaceScene.pick
+    values = {"pvals": pvals, "mask": mask, "parcel": parcel}
+    if len(overlays) == 1:
+        values["overlay"] = overlays[0]
+    else:
+        values.update((f"overlay_{i}", overlay) for i, overlay in enumerate(overlays))
+    scene = SurfaceScene(
+        T,
+        depth,
+        layers,
+        limits,
+        triangles=F[order],
+        transparency=transparency,
+        values={key: value for key, value in values.items() if value is not None},
+        corner_layers=corner_layers if interpolate else None,
+    )
+    # add arrows to image
+    if arrows is not None:
+        scene.arrows = arrow_geometry(
+            mesh,
+            MVP,
+            front,
+            arrows,
+            arrow_subset,
+            arrow_size=arrow_size,
+            arrow_colours=arrow_colours,
+            arrow_head=arrow_head,
+            arrow_width=arrow_width,
         )
-        # translate coordinates based on viewing position
-        V = np.c_[vertices, np.ones(len(vertices))] @ MVP.T
+    scene.draw(
+        ax,
+        backend=backend,
+        raster_dpi=raster_dpi,
+        supersample=supersample,
+        merge_faces=merge_faces and backend == "vector",
+        cmap=cmap,
+    )
+    return scene
 
-        V /= V[:, 3].reshape(-1, 1)
-        center = np.array([0, 0, 0, 1]) @ MVP.T
-        center /= center[3]
-        # add vertex positions to A_dir before transforming them
-        if arrows is not None:
-            # calculate arrow position + small shift in surface normal direction
-            vertex_normal_orig = vertex_normals(vertices, faces)
-            A_base = (
-                np.c_[vertices + vertex_normal_orig * 0.01, np.ones(len(vertices))]
-                @ MVP.T
+
+def plot_surf_views(
+    mesh,
+    overlay,
+    views=("lateral", "medial"),
+    axes=None,
+    x_rotate=270,
+    z_rotate=0,
+    flat_map=False,
+    show_back=False,
+    transparency=1,
+    backend="vector",
+    raster_dpi=None,
+    supersample=2,
+    **kwargs,
+):
+    """Plot overlay(s) on a surface from several views in one pass.
+
+    Face colours, masking and shading are computed once per overlay, each
+    view then only adds its projection, back-face culling and depth sort.
+
+    Parameters:
+    -----------
+    mesh : SurfaceMesh or (vertices, faces) tuple
+        Surface to plot.
+    overlay : array or list of arrays
+        Per-vertex values, a list is drawn as stacked layers.
+    views : list
+        View names (see VIEWS) or rotation angles, one per axis.
+    axes : list of matplotlib.axes.Axes, optional
+        Axes to draw into. A single row of axes is created if None.
+    backend, raster_dpi, supersample :
+        Rendering backend, see plot_surf.
+    kwargs :
+        Colour options of plot_surf, e.g. cmap, label, vmin, vmax, pvals,
+        mask, parcel. Arrows are not supported.
+
+    Returns:
+    --------
+    axes : list of matplotlib.axes.Axes
+    """
+    if backend not in ("vector", "raster"):
+        raise ValueError(f"Unknown backend '{backend}', use 'vector' or 'raster'.")
+    if not isinstance(mesh, SurfaceMesh):
+        mesh = SurfaceMesh(*mesh)
+    if axes is None:
+        fig, axes = plt.subplots(1, len(views), figsize=(3 * len(views), 3))
+    axes = np.atleast_1d(axes).ravel()
+    if len(axes) != len(views):
+        raise ValueError("Expected one axis per view.")
+    overlays = overlay if isinstance(overlay, list) else [overlay]
+
+    if flat_map:
+        z_rotate = 90
+    intensity = light_intensity(mesh, z_rotate, flat_map)
+    layers = []
+    for overlay in overlays:
+        C, kwargs["vmin"], kwargs["vmax"] = overlay_colours(mesh, overlay, **kwargs)
+        C[:, :3] *= intensity[:, np.newaxis]
+        layers.append(C)
+
+    for ax, view in zip(axes, views):
+        view, view_x_rotate = resolve_view(view, x_rotate)
+        MVP = mvp_matrix(view, view_x_rotate, z_rotate, flat_map)
+        T, order, front, limits, depth = project_faces(
+            mesh.vertices, mesh.faces, MVP, show_back, return_depth=True
+        )
+        if backend == "raster":
+            width, height = raster_size(ax, limits, raster_dpi)
+            face_buffer = rasterize_faces(
+                T, depth, width * supersample, height * supersample, limits
             )
-            A_base /= A_base[:, 3].reshape(-1, 1)
-
-            # calculate arrow direction
-            A_dir = np.copy(arrows)
-            # normalise arrow size
-            max_arrow = np.max(np.linalg.norm(arrows, axis=1))
-            A_dir = arrow_size * A_dir / max_arrow
-            A_dir = np.c_[A_dir, np.ones(len(A_dir))] @ MVP.T
-            A_dir /= A_dir[:, 3].reshape(-1, 1)
-        # A_dir *= 0.1;
-
-        V = V[F]
-
-        # triangle coordinates
-        T = V[:, :, :2]
-        # get Z values for ordering triangle plotting
-        Z = -V[:, :, 2].mean(axis=1)
-        # sort the triangles based on their z coordinate. If front/back views then need to sort a different axis
-        front, back = frontback(T)
-        if show_back == False:
-            T = T[front]
-            s_C = C[front]
-            Z = Z[front]
-        else:
-            s_C = C
-        I = np.argsort(Z)
-        T, s_C = T[I, :], s_C[I, :]
+            for C in layers:
+                image = render_image(face_buffer, C[order], supersample)
+                draw_image(ax, image, limits, transparency=transparency)
+            continue
+        paths = None
+        for C in layers:
+            collection = draw_faces(
+                ax,
+                T,
+                C[order],
+                limits,
+                transparency=transparency,
+                cmap=kwargs.get("cmap", "viridis"),
+                paths=paths,
+            )
+            paths = collection.get_paths()
+    return list(axes)
 
-        collection = PolyCollection(
-            T, closed=True, linewidth=0, antialiased=False, facecolor=s_C, cmap=cmap
+
+class SurfaceAnimation:
+    """Animate per-vertex frames of values on a fixed view of a surface.
+
+    The mesh is projected, culled and depth sorted once and drawn as a
+    single PolyCollection, every frame then only maps its values to the
+    colours of the drawn faces and updates the collection with
+    set_facecolor. Masks, p-value rings and parcels do not change between
+    frames, so they are resolved once into a per-face scale and offset of
+    the colours (see annotate_colours).
+
+    Parameters:
+    -----------
+    mesh : SurfaceMesh or (vertices, faces) tuple
+        Surface to plot.
+    frames : (n_frames, n_vertices) array
+        Per-vertex values of every frame.
+    ax : matplotlib.axes.Axes, optional
+        Axes to draw into, created if None.
+    view, x_rotate, z_rotate, flat_map, show_back, transparency :
+        Camera and drawing options, see plot_surf.
+    vmin, vmax : float, optional
+        Colour scale shared by all frames, taken from all frames if None.
+    kwargs :
+        Other colour options of plot_surf, e.g. cmap, label, mask, pvals,
+        parcel.
+    """
+
+    def __init__(
+        self,
+        mesh,
+        frames,
+        ax=None,
+        view="lateral",
+        x_rotate=270,
+        z_rotate=0,
+        flat_map=False,
+        show_back=False,
+        transparency=1,
+        vmin=None,
+        vmax=None,
+        **kwargs,
+    ):
+        if not isinstance(mesh, SurfaceMesh):
+            mesh = SurfaceMesh(*mesh)
+        if ax is None:
+            fig, ax = plt.subplots(1, 1, figsize=(4, 4))
+        self.mesh = mesh
+        self.frames = np.asarray(frames)
+        self.ax = ax
+        if vmin is None:
+            vmin = np.nanmin(self.frames)
+        if vmax is None:
+            vmax = np.nanmax(self.frames)
+        annotations = {
+            key: kwargs.pop(key)
+            for key in (
+                "pvals",
+                "mask",
+                "mask_colour",
+                "border_colour",
+                "neighbours",
+                "parcel",
+                "parcel_cmap",
+                "filled_parcels",
+                "ring_width",
+            )
+            if key in kwargs
+        }
+        self._colour_kwargs = dict(kwargs, vmin=vmin, vmax=vmax)
+
+        view, x_rotate = resolve_view(view, x_rotate)
+        if flat_map:
+            z_rotate = 90
+        MVP = mvp_matrix(view, x_rotate, z_rotate, flat_map)
+        T, self._order, front, limits = project_faces(
+            mesh.vertices, mesh.faces, MVP, show_back
         )
-        for path in collection.get_paths():
-            path.codes[-1] = 0
+        self._intensity = light_intensity(mesh, z_rotate, flat_map)[
+            self._order, np.newaxis
+        ]
+        self._scale = self._offset = None
+        if any(annotations.get(key) is not None for key in ("pvals", "mask", "parcel")):
+            # each drawn face maps its colour c to scale * c + offset, read
+            # off from annotating all-zero and all-one colours
+            triangles = mesh.faces[self._order]
+            parcel = annotations.get("parcel")
+            if parcel is not None and annotations.get("parcel_cmap") is None:
+                # both calls need the same random parcel colours
+                rois = np.unique(parcel)
+                annotations["parcel_cmap"] = dict(
+                    zip(rois, np.random.rand(len(rois), 4))
+                )
+            zero, one = (
+                annotate_colours(
+                    np.full((len(triangles), 4), value, dtype=np.float32),
+                    mesh,
+                    triangles,
+                    **annotations,
+                )
+                for value in (0, 1)
+            )
+            self._scale = one - zero
+            self._offset = zero
+        self.collection = draw_faces(
+            ax,
+            T,
+            self.face_colours(0),
+            limits,
+            transparency=transparency,
+            cmap=kwargs.get("cmap", "viridis"),
+        )
+
+    def __len__(self):
+        return len(self.frames)
 
-        collection.set_alpha(transparency)
-        ax.add_collection(collection)
+    def face_colours(self, i):
+        """Shaded colours of the drawn faces for frame i"""
+        if self._scale is None:
+            C, _, _ = fused_overlay_colours(
+                self.mesh,
+                self.frames[i],
+                self._order,
+                self._intensity,
+                **self._colour_kwargs,
+            )
+            return C
+        C, _, _ = fused_overlay_colours(
+            self.mesh, self.frames[i], self._order, **self._colour_kwargs
+        )
+        C *= self._scale
+        C += self._offset
+        C[:, :3] *= self._intensity
+        return C
+
+    def update(self, i):
+        """Show frame i"""
+        self.collection.set_facecolor(self.face_colours(i))
+        return (self.collection,)
+
+    def animation(self, interval=50, **kwargs):
+        """matplotlib FuncAnimation over all frames"""
+        return FuncAnimation(
+            self.ax.figure,
+            self.update,
+            frames=len(self),
+            interval=interval,
+            blit=False,
+            **kwargs,
+        )
+
+    def save(self, filename, writer=None, fps=20, dpi=None, **kwargs):
+        """Write all frames to a movie through a matplotlib animation writer"""
+        self.animation(interval=1000 / fps).save(
+            filename, writer=writer, fps=fps, dpi=dpi, **kwargs
+        )
 
-        # Project vertices
-        V = np.c_[vertices, np.ones(len(vertices))] @ MVP.T
-        V /= V[:, 3, np.newaxis]
+    def save_frames(self, pattern, dpi=None, **kwargs):
+        """Write every frame to an image file, pattern is formatted with the
+        frame index, e.g. 'frame_{:04d}.png'. Returns the file names."""
+        filenames = []
+        for i in range(len(self)):
+            self.update(i)
+            filenames.append(pattern.format(i))
+            self.ax.figure.savefig(filenames[-1], dpi=dpi, **kwargs)
+        return filenames
 
-        # Calculate x and y limits based on projected vertices
-        x_min, x_max = V[:, 0].min(), V[:, 0].max()
-        y_min, y_max = V[:, 1].min(), V[:, 1].max()
 
-        # Set xlim and ylim based on vertex coordinates
-        ax.set_xlim([x_min, x_max])
-        ax.set_ylim([y_min, y_max])
+class InteractiveSurface:
+    """Surface plot whose camera can be moved at interactive rates.
 
+    Geometry and overlay colours stay resident: a camera change, through
+    set_camera or by dragging with the mouse after connect, only projects
+    the vertices again, updates the shading when z_rotate changes and
+    redraws. With backend="vector" the faces are re-sorted by depth starting
+    from the previous order, which is nearly sorted for small camera moves
+    and sorts faster than the faces in index order. The polygons are views
+    into one coordinate buffer that is overwritten in place, so no
+    matplotlib paths are built after the first frame. With backend="raster"
+    no sort is needed and the depth buffered image is replaced instead;
+    drawing tens of thousands of polygons dominates the vector frame time,
+    so use the raster backend for meshes of fsaverage6 size and above.
+
+    Parameters:
+    -----------
+    mesh : SurfaceMesh or (vertices, faces)
+    overlay : (n_vertices,) array
+    ax : matplotlib axes, optional
+        A new figure is made by default.
+    view, x_rotate, z_rotate, show_back, transparency :
+        As in plot_surf.
+    backend, raster_dpi, supersample :
+        As in plot_surf, but supersample defaults to 1 for speed.
+    **kwargs
+        Colour options of plot_surf, e.g. cmap, vmin, vmax, mask or pvals.
+    """
+
+    def __init__(
+        self,
+        mesh,
+        overlay,
+        ax=None,
+        view="lateral",
+        x_rotate=270,
+        z_rotate=0,
+        show_back=False,
+        transparency=1,
+        backend="vector",
+        raster_dpi=None,
+        supersample=1,
+        **kwargs,
+    ):
+        if backend not in ("vector", "raster"):
+            raise ValueError(f"Unknown backend '{backend}', use 'vector' or 'raster'.")
+        if not isinstance(mesh, SurfaceMesh):
+            mesh = SurfaceMesh(*mesh)
+        if ax is None:
+            fig, ax = plt.subplots(1, 1, figsize=(4, 4))
+        self.mesh = mesh
+        self.ax = ax
+        self.show_back = show_back
+        self.backend = backend
+        self.raster_dpi = raster_dpi
+        self.supersample = supersample
+        self.colours, self.vmin, self.vmax = overlay_colours(mesh, overlay, **kwargs)
+        self.view, self.x_rotate = resolve_view(view, x_rotate)
+        self.z_rotate = z_rotate
+
+        # faces sorted back to front in the last frame
+        self._sorted = np.arange(mesh.n_faces)
+        self._shaded_z_rotate = None
+        if backend == "raster":
+            self.image = ax.imshow(
+                np.zeros((1, 1, 4)),
+                alpha=transparency,
+                interpolation="nearest",
+                origin="upper",
+            )
+        else:
+            self._buffer = np.zeros((mesh.n_faces, 4, 2))
+            codes = np.array(
+                [Path.MOVETO, Path.LINETO, Path.LINETO, Path.STOP],
+                dtype=Path.code_type,
+            )
+            self._paths = [Path(xy, codes) for xy in self._buffer]
+            self.collection = PathCollection([], linewidth=0, antialiased=False)
+            self.collection.set_alpha(transparency)
+            ax.add_collection(self.collection, autolim=False)
         ax.set_aspect("equal")
         ax.axis("off")
+        self._drag = None
+        self._update()
 
-        # add arrows to image
-        if arrows is not None:
-            front_arrows = F[front].ravel()
-            for arrow_index, i in enumerate(arrow_subset):
-                if i in front_arrows and A_base[i, 2] < center[2] + 0.01:
-                    arrow_colour = "k"
-                    if arrow_colours is not None:
-                        arrow_colour = arrow_colours[arrow_index]
-                    # if length of arrows corresponds perfectly with coordinates
-                    # assume 1:1 matching
-                    if len(A_dir) == len(A_base):
-                        direction = A_dir[i]
-                    # otherwise, assume it is a custom list matching the
-                    elif len(A_dir) == len(arrow_subset):
-                        direction = A_dir[arrow_index]
-                    half = direction * 0.5
-
-                    ax.arrow(
-                        A_base[i, 0] - half[0],
-                        A_base[i, 1] - half[1],
-                        direction[0],
-                        direction[1],
-                        head_width=arrow_head,
-                        width=arrow_width,
-                        color=arrow_colour,
-                    )
-                # ax.arrow(A_base[idx,0], A_base[idx,1], A_dir[i,0], A_dir[i,1], head_width=0.01)
-            plt.subplots_adjust(left=0, right=1, top=1, bottom=0, wspace=0, hspace=0)
+    def set_camera(self, view=None, x_rotate=None, z_rotate=None):
+        """Move the camera, arguments left as None keep their value.
+        view can be a name from VIEWS, which may also set x_rotate."""
+        if x_rotate is not None:
+            self.x_rotate = x_rotate
+        if view is not None:
+            self.view, self.x_rotate = resolve_view(view, self.x_rotate)
+        if z_rotate is not None:
+            self.z_rotate = z_rotate
+        self._update()
+        self.ax.figure.canvas.draw_idle()
+
+    def _update(self):
+        MVP = mvp_matrix(self.view, self.x_rotate, self.z_rotate)
+        V = np.c_[self.mesh.vertices, np.ones(self.mesh.n_vertices)] @ MVP.T
+        V /= V[:, 3].reshape(-1, 1)
+        limits = (V[:, 0].min(), V[:, 0].max(), V[:, 1].min(), V[:, 1].max())
+        if self.backend == "vector":
+            # np.take gathers rows much faster than fancy indexing
+            Z = -np.take(V[:, 2], self.mesh.faces).mean(axis=1)
+            # start from the previous order, which is nearly sorted
+            self._sorted = self._sorted[np.argsort(Z[self._sorted])]
+        order = self._sorted
+        faces = np.take(self.mesh.faces, order, axis=0)
+        T = np.take(np.ascontiguousarray(V[:, :2]), faces, axis=0)
+        if not self.show_back:
+            front, back = frontback(T)
+            order, faces, T = order[front], faces[front], T[front]
+        if self._shaded_z_rotate != self.z_rotate:
+            self._shaded = self.colours.copy()
+            self._shaded[:, :3] *= light_intensity(self.mesh, self.z_rotate)[
+                :, np.newaxis
+            ]
+            self._shaded_z_rotate = self.z_rotate
+        colours = np.take(self._shaded, order, axis=0)
+
+        if self.backend == "raster":
+            width, height = raster_size(self.ax, limits, self.raster_dpi)
+            face_buffer = rasterize_faces(
+                T,
+                np.take(V[:, 2], faces),
+                width * self.supersample,
+                height * self.supersample,
+                limits,
+            )
+            self.image.set_data(render_image(face_buffer, colours, self.supersample))
+            self.image.set_extent(limits)
+        else:
+            self._buffer[: len(T), :3] = T
+            self.collection.set_paths(self._paths[: len(T)])
+            self.collection.set_facecolor(colours)
+        self.ax.set_xlim(limits[:2])
+        self.ax.set_ylim(limits[2:])
+
+    def connect(self, degrees_per_pixel=0.5):
+        """Rotate the surface by dragging with the mouse: horizontal moves
+        change view, vertical moves change x_rotate."""
+        canvas = self.ax.figure.canvas
+
+        def press(event):
+            if event.inaxes is self.ax:
+                self._drag = (event.x, event.y, self.view, self.x_rotate)
+
+        def release(event):
+            self._drag = None
+
+        def motion(event):
+            if self._drag is None or event.x is None:
+                return
+            x, y, view, x_rotate = self._drag
+            self.set_camera(
+                view=view + (event.x - x) * degrees_per_pixel,
+                x_rotate=x_rotate - (event.y - y) * degrees_per_pixel,
+            )
+
+        self._callbacks = [
+            canvas.mpl_connect("button_press_event", press),
+            canvas.mpl_connect("button_release_event", release),
+            canvas.mpl_connect("motion_notify_event", motion),
+        ]
+        return self
+
+    def disconnect(self):
+        """Stop reacting to the mouse"""
+        for callback in getattr(self, "_callbacks", []):
+            self.ax.figure.canvas.mpl_disconnect(callback)
+        self._callbacks = []
+
+
+# state of a render_surface_batch worker process, set by _init_batch_worker
+_batch_worker = {}
+
+
+def _init_batch_worker(directory, kwargs):
+    plt.switch_backend("Agg")
+    _batch_worker["mesh"] = SurfaceMesh.load_arrays(directory)
+    overlays = os.path.join(directory, "overlays.npy")
+    if os.path.exists(overlays):
+        _batch_worker["overlays"] = np.load(overlays, mmap_mode="r")
+    _batch_worker["kwargs"] = kwargs
+
+
+def _render_batch_item(item):
+    """Render one figure in a worker, returns None or the formatted error"""
+    index, overlay, out_path = item
+    if overlay is None:
+        overlay = _batch_worker["overlays"][index]
+    kwargs = dict(_batch_worker["kwargs"])
+    figsize = kwargs.pop("figsize")
+    savefig_kwargs = kwargs.pop("savefig_kwargs")
+    fig, ax = plt.subplots(1, 1, figsize=figsize)
+    try:
+        plot_surf(_batch_worker["mesh"], overlay=overlay, ax=ax, **kwargs)
+        fig.savefig(out_path, **savefig_kwargs)
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        plt.close(fig)
+    return None
+
+
+def render_surface_batch(
+    mesh,
+    overlays,
+    out_paths,
+    n_workers=None,
+    figsize=(4, 4),
+    savefig_kwargs=None,
+    chunksize=None,
+    **kwargs,
+):
+    """Render one plot_surf figure per overlay on a shared mesh and save
+    them to out_paths, in parallel worker processes.
+
+    The mesh with its normalized vertices, face normals and adjacency is
+    written once as memory-mapped .npy files in a temporary directory, so
+    that every worker maps the same pages instead of receiving and
+    recomputing the geometry. A 2D overlays array is shared the same way,
+    only indices are sent to the workers; any other sequence of overlays is
+    sent item by item. Workers draw with the Agg backend.
+
+    Parameters:
+    -----------
+    mesh : SurfaceMesh or (vertices, faces)
+    overlays : (n, n_vertices) array or sequence of n overlays
+        Anything plot_surf accepts as overlay, including lists of layers.
+    out_paths : sequence of n file names
+    n_workers : int, optional
+        Number of processes, os.cpu_count() by default.
+    figsize : tuple
+        Size of every figure.
+    savefig_kwargs : dict, optional
+        Passed to savefig, e.g. dpi or transparent.
+    chunksize : int, optional
+        Items sent to a worker at a time, by default spread evenly with
+        about four chunks per worker.
+    **kwargs
+        Passed to plot_surf.
+
+    Returns:
+    --------
+    errors : list
+        None for every figure that was saved, otherwise the formatted
+        traceback of its failure. A failing item does not stop the batch.
+    """
+    if not isinstance(mesh, SurfaceMesh):
+        mesh = SurfaceMesh(*mesh)
+    if len(overlays) != len(out_paths):
+        raise ValueError(
+            f"Got {len(overlays)} overlays for {len(out_paths)} output paths."
+        )
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(out_paths) // (4 * n_workers))
+    kwargs = dict(kwargs, figsize=figsize, savefig_kwargs=dict(savefig_kwargs or {}))
+    shared = isinstance(overlays, np.ndarray) and overlays.ndim == 2
+    with tempfile.TemporaryDirectory() as directory:
+        mesh.save_arrays(directory)
+        if shared:
+            np.save(os.path.join(directory, "overlays.npy"), overlays)
+        items = [
+            (i, None if shared else overlays[i], out_path)
+            for i, out_path in enumerate(out_paths)
+        ]
+        with ProcessPoolExecutor(
+            n_workers, initializer=_init_batch_worker, initargs=(directory, kwargs)
+        ) as pool:
+            return list(pool.map(_render_batch_item, items, chunksize=chunksize))
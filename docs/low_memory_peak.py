@@ -0,0 +1,112 @@
+"""Peak memory of plot_surf with and without low_memory.
+
+Colours the same overlay on a large synthetic surface with both colour
+pipelines and reports the peak of Python-allocated memory (tracemalloc),
+for the colour step alone and for a whole plot_surf call, whose peak also
+includes projection and rasterisation. Peaks are measured on surfaces of
+n // 2 and n vertices a side and reported as bytes per face of their
+difference, which leaves out the pixel buffers and the temporaries of
+chunks, whose size does not depend on the mesh. Both colour steps include
+the order of all faces. Fails if the low_memory colour step needs more
+than half of the default one per face, or plot_surf with low_memory more
+than 100 bytes per face or two thirds of the default. Run with:
+python docs/low_memory_peak.py [n]
+where the larger surface has 2 * (n - 1) ** 2 faces.
+"""
+
+import sys
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from bss_plot.matplotlib_surface_plotting import (
+    SurfaceMesh,
+    fused_overlay_colours,
+    overlay_colours,
+    plot_surf,
+)
+
+
+def grid_mesh(n):
+    """Bumpy n x n vertex sheet triangulated into 2 * (n - 1) ** 2 faces"""
+    x, y = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n))
+    z = 0.1 * np.sin(4 * x) * np.cos(3 * y)
+    vertices = np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+    corner = (np.arange(n - 1)[:, np.newaxis] * n + np.arange(n - 1)).ravel()
+    faces = np.concatenate(
+        [
+            np.column_stack([corner, corner + 1, corner + n]),
+            np.column_stack([corner + 1, corner + n + 1, corner + n]),
+        ]
+    )
+    return vertices, faces
+
+
+def peak_mib(function, *args, **kwargs):
+    tracemalloc.start()
+    function(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def default_colours(mesh, overlay):
+    colours = overlay_colours(mesh, overlay)[0][np.arange(mesh.n_faces)]
+    colours[:, :3] *= mesh.shading_intensity()[:, np.newaxis]
+    return colours
+
+
+def low_memory_colours(mesh, overlay):
+    intensity = mesh.shading_intensity()[:, np.newaxis]
+    return fused_overlay_colours(mesh, overlay, np.arange(mesh.n_faces), intensity)
+
+
+def render(mesh, overlay, **kwargs):
+    fig, ax = plt.subplots(1, 1, figsize=(4, 4))
+    plot_surf(mesh, overlay=overlay, ax=ax, view="dorsal", **kwargs)
+    plt.close(fig)
+
+
+def bytes_per_face(function, meshes, **kwargs):
+    """Growth of the peak of function(mesh, overlay, **kwargs) from the
+    smaller to the larger mesh per added face"""
+    (small, small_overlay), (large, large_overlay) = meshes
+    growth = peak_mib(function, large, large_overlay, **kwargs) - peak_mib(
+        function, small, small_overlay, **kwargs
+    )
+    return growth * 2**20 / (large.n_faces - small.n_faces)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    meshes = []
+    for size in (n // 2, n):
+        mesh = SurfaceMesh(*grid_mesh(size))
+        overlay = mesh.vertices[:, 0] * mesh.vertices[:, 1]
+        # warm up the cached geometry so that it is not counted
+        render(mesh, overlay, backend="raster")
+        meshes.append((mesh, overlay))
+    print(f"{meshes[0][0].n_faces} and {meshes[1][0].n_faces} faces")
+    per_face = {}
+    for name, function in (
+        ("default colours", default_colours),
+        ("low_memory colours", low_memory_colours),
+    ):
+        per_face[name] = bytes_per_face(function, meshes)
+    for low_memory in (False, True):
+        per_face[f"plot_surf low_memory={low_memory}"] = bytes_per_face(
+            render, meshes, backend="raster", low_memory=low_memory
+        )
+    for name, value in per_face.items():
+        print(f"{name}: {value:.0f} bytes per face")
+    assert per_face["low_memory colours"] < per_face["default colours"] / 2
+    assert per_face["plot_surf low_memory=True"] < 100
+    assert (
+        per_face["plot_surf low_memory=True"]
+        < per_face["plot_surf low_memory=False"] * 2 / 3
+    )